@@ -0,0 +1,106 @@
+"""Micro-benchmark for contract address extraction and validation.
+
+Runs the legacy per-message ``re.findall(os.getenv('CA_PATTERN', ...))`` path,
+the compiled multi-chain extractor, and extraction plus AddressValidator
+(cold: every address new; warm: verdicts cached) over a corpus of
+channel-style posts and prints the per-message cost of each.
+
+    python bench_extractor.py [--messages 20000]
+"""
+import argparse
+import os
+import random
+import re
+import string
+import time
+
+from ca_extractor import AddressExtractor
+from ca_validator import AddressValidator, to_checksum_address
+
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+TEMPLATES = [
+    "🚀 NEW GEM ALERT 🚀\n\n{evm}\n\nLP locked ✅ Renounced ✅ Tax 0/0\nChart: https://dexscreener.com/ethereum/{evm}",
+    "Aping this one 👀 {evm}",
+    "🔥 {name} just launched on pump\nCA: {sol}\nhttps://pump.fun/coin/{sol}",
+    "gm degens, market looking spicy today. no call yet, stay tuned 🫡",
+    "{name} 50x from our entry!! 📈📈 who's still holding",
+    "Base play 🔵\nhttps://dexscreener.com/base/{evm}\nTG: t.me/{name}portal  X: x.com/{name}",
+    "⚠️ SCAM WARNING ⚠️ do not buy {evm} dev dumped",
+    "Solana runner {sol} mc 40k, vol pumping, LFG",
+    "{name} {name} {name} 🚀🚀🚀 " + "moon " * 30,
+    "multi call: {evm} / {evm2} / {sol}",
+    "stealth 🤫 {bad_evm}",
+    "paired with WETH 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2, ca {evm}",
+]
+
+
+def random_evm(rng):
+    """A valid address: EIP-55 checksummed or all lowercase, as posted in the wild."""
+    address = '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))
+    return to_checksum_address(address) if rng.random() < 0.5 else address
+
+
+def random_bad_evm(rng):
+    """Mixed case that (almost certainly) fails the EIP-55 checksum."""
+    return '0x' + ''.join(rng.choice('0123456789abcdefABCDEF') for _ in range(40))
+
+
+def random_sol(rng):
+    """Base58 of a random 32-byte key, like a real Solana mint."""
+    number = rng.getrandbits(256)
+    encoded = ''
+    while number:
+        number, digit = divmod(number, 58)
+        encoded = BASE58[digit] + encoded
+    return encoded
+
+
+def build_corpus(count, seed=1):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        template = rng.choice(TEMPLATES)
+        corpus.append(template.format(
+            evm=random_evm(rng),
+            evm2=random_evm(rng),
+            bad_evm=random_bad_evm(rng),
+            sol=random_sol(rng),
+            name=''.join(rng.choice(string.ascii_uppercase) for _ in range(5)),
+        ))
+    return corpus
+
+
+def bench(label, fn, corpus):
+    start = time.perf_counter()
+    hits = 0
+    for text in corpus:
+        hits += len(fn(text))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / len(corpus) * 1e6:8.2f} us/msg  {len(corpus) / elapsed:10.0f} msg/s  {hits} hits")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+    extractor = AddressExtractor()
+
+    bench("legacy re.findall(getenv)", lambda text: re.findall(os.getenv('CA_PATTERN', r'0x[a-fA-F0-9]{40}'), text), corpus)
+    bench("AddressExtractor.extract", extractor.extract, corpus)
+
+    validator = AddressValidator(cache_size=len(corpus) * 4)
+
+    def extract_and_validate(text):
+        return validator.filter(extractor.extract(text))[0]
+
+    bench("extract + validate (cold)", extract_and_validate, corpus)
+    bench("extract + validate (warm)", extract_and_validate, corpus)
+    rejected = {reason: count // 2 for reason, count in validator.stats.items() if reason != 'accepted'}
+    print(f"rejected per pass: {rejected}")
+
+
+if __name__ == '__main__':
+    main()
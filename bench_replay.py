@@ -0,0 +1,252 @@
+"""Replay benchmark for monitor_account.handle_new_message.
+
+Feeds synthetic (or recorded) channel posts into the real handler through
+fake_telethon's client and event objects, so it runs offline. Reports
+throughput, forward latency percentiles and peak memory per scenario.
+
+    python bench_replay.py                       # all scenarios
+    python bench_replay.py --scenario spam_burst --send-latency 0.2 --flood-rate 0.05
+    python bench_replay.py --replay recorded.jsonl --json
+    python bench_replay.py --check               # fail if any CA is forwarded twice
+    python bench_replay.py --bot-delay 0.01      # also deliver every post via a racing Bot API source
+
+A recorded stream is JSONL with {"channel": <index>, "text": ..., "delay": <seconds>}.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import monitor_account as app
+from bench_extractor import build_corpus, random_evm, random_sol
+from catchup import LastSeenStore
+from channel_registry import ChannelRegistry
+from dedup_store import MemoryDedupStore, SQLiteDedupStore
+from dispatcher import Dispatcher, IN_FLIGHT
+from event_log import EventLog
+from fake_telethon import FakeClient, FakeEvent, FakeMessage
+from forward_targets import ForwardTargets
+from ingest import BOTAPI, IngestCore, Post, SourceRaces
+from latency import LatencyTracker
+from notifier import Notifier
+from send_scheduler import SendScheduler
+
+
+def scenario_quiet(rng):
+    """10 channels, 40 mostly chatty posts 0.1-0.5s apart (about 12s): the unloaded baseline."""
+    corpus = build_corpus(40, seed=rng.random())
+    return 10, [(rng.uniform(0.1, 0.5), rng.randrange(10), text) for text in corpus]
+
+
+def scenario_spam_burst(rng):
+    """50 channels all posting at once, many shilling the same handful of CAs."""
+    shared = [random_evm(rng) for _ in range(20)]
+    stream = []
+    for _ in range(40):
+        for channel in range(50):
+            ca = rng.choice(shared) if rng.random() < 0.7 else random_evm(rng)
+            stream.append((0, channel, f"🚀 APE NOW 🚀 {ca} LP locked, 0/0 tax"))
+    return 50, stream
+
+
+def scenario_duplicate_flood(rng):
+    """Every post carries the same CA."""
+    ca = random_evm(rng)
+    return 20, [(0, i % 20, f"{ca} 🔥🔥🔥") for i in range(2000)]
+
+
+def scenario_many_addresses(rng):
+    """Posts listing ten addresses each (multi-call / trending lists)."""
+    stream = []
+    for i in range(200):
+        addresses = [random_evm(rng) if j % 2 else random_sol(rng) for j in range(10)]
+        stream.append((0, i % 10, "Trending now:\n" + "\n".join(addresses)))
+    return 10, stream
+
+
+def scenario_simultaneous_posts(rng):
+    """Every channel posts the same fresh CA in the same tick, 100 times over."""
+    stream = []
+    for _ in range(100):
+        ca = random_evm(rng)
+        for channel in range(25):
+            # Mix case so the race also covers 0xAbc vs 0xabc
+            text = ca if channel % 2 else ca.lower()
+            stream.append((0, channel, f"CALL {text}"))
+    return 25, stream
+
+
+SCENARIOS = {
+    'quiet': scenario_quiet,
+    'spam_burst': scenario_spam_burst,
+    'duplicate_flood': scenario_duplicate_flood,
+    'many_addresses': scenario_many_addresses,
+    'simultaneous_posts': scenario_simultaneous_posts,
+}
+
+
+def load_replay(path):
+    stream = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                stream.append((record.get('delay', 0), int(record.get('channel', 0)), record['text']))
+    channel_count = max(channel for _, channel, _ in stream) + 1 if stream else 1
+    return channel_count, stream
+
+
+async def run_stream(name, channel_count, stream, args, workdir):
+    client = FakeClient(
+        send_latency=args.send_latency,
+        jitter=args.send_latency / 4,
+        failure_rate=args.failure_rate,
+        flood_wait_rate=args.flood_rate,
+    )
+    peer_ids = []
+    for index in range(channel_count):
+        peer_id = -1000000000000 - (index + 1)
+        client.add_channel(peer_id, username=f'bench_channel_{index}')
+        peer_ids.append(peer_id)
+
+    cache_file = os.path.join(workdir, f'{name}_channels.json')
+    app.channel_registry = await ChannelRegistry(
+        [f'@bench_channel_{index}' for index in range(channel_count)], cache_file=cache_file,
+    ).resolve(client)
+    if args.store == 'sqlite':
+        app.dedup_store = SQLiteDedupStore(os.path.join(workdir, f'{name}.db'), legacy_file=None)
+    else:
+        app.dedup_store = MemoryDedupStore()
+    app.latency_tracker = LatencyTracker(trace_file=None, window=len(stream) * 10)
+    app.notifier = Notifier()
+    # Records are queued and drained as in a real run, but not written anywhere
+    app.event_log = EventLog(path=None)
+    app.event_log.start()
+    app.last_seen = LastSeenStore(os.path.join(workdir, f'{name}_state.json'))
+    app.forward_targets = ForwardTargets([f'bench_bot_{index}' for index in range(args.targets)])
+    app.dispatcher = Dispatcher(app.dedup_store, max_concurrency=None)
+    app.source_races = SourceRaces()
+    app.ingest_core = IngestCore(app.extractor, app.dispatcher, app.source_races)
+    app.scheduler = SendScheduler(
+        client.send_message, rate=args.send_rate, burst=args.send_rate,
+        workers=args.concurrency, max_age=args.max_age,
+    )
+    app.scheduler.start()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    tasks = []
+    rng = random.Random(args.seed)
+
+    async def deliver_later(handler, make, delay):
+        await asyncio.sleep(delay)
+        await handler(make())
+
+    for message_id, (delay, channel, text) in enumerate(stream, start=1):
+        if delay:
+            await asyncio.sleep(delay)
+        event = FakeEvent(client, peer_ids[channel], FakeMessage(message_id, text))
+        if args.bot_delay is None:
+            tasks.append(asyncio.create_task(app.handle_new_message(event)))
+            continue
+        # Both sources see the post after independent random delays
+        make_post = lambda peer_id=peer_ids[channel], channel=channel, message_id=message_id, text=text: Post(
+            BOTAPI, peer_id, f'bench_channel_{channel}', message_id, text)
+        tasks.append(asyncio.create_task(deliver_later(app.handle_new_message, lambda event=event: event, rng.uniform(0, 0.02))))
+        tasks.append(asyncio.create_task(deliver_later(app.process_post, make_post, rng.uniform(0, 2 * args.bot_delay))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    await app.scheduler.stop()
+    app.event_log.stop()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    app.dedup_store.close()
+
+    forward = app.latency_tracker.percentiles('internal')
+    unique_forwarded = len({(entity, message.lower()) for _, entity, message in client.sent})
+    return {
+        'scenario': name,
+        'messages': len(stream),
+        'channels': channel_count,
+        'seconds': round(elapsed, 4),
+        'messages_per_second': round(len(stream) / elapsed, 1) if elapsed else None,
+        'forwards': len(client.sent),
+        'unique_forwarded': unique_forwarded,
+        'double_forwards': len(client.sent) - unique_forwarded,
+        'races_blocked': app.dispatcher.stats[IN_FLIGHT],
+        'first_seen': app.source_races.summary() if args.bot_delay is not None else None,
+        'send_failures': client.failures,
+        'flood_waits': client.flood_waits,
+        'send_retries': app.scheduler.stats['retries'],
+        'stale_dropped': app.scheduler.stats['stale'],
+        'forward_p50_ms': round(forward[0.5] * 1000, 2) if forward else None,
+        'forward_p95_ms': round(forward[0.95] * 1000, 2) if forward else None,
+        'forward_p99_ms': round(forward[0.99] * 1000, 2) if forward else None,
+        'peak_memory_mb': round(peak / 1024 / 1024, 2),
+    }
+
+
+def print_result(result):
+    print(f"\n== {result['scenario']} ({result['messages']} messages, {result['channels']} channels)")
+    print(f"  throughput     {result['messages_per_second']} msg/s over {result['seconds']}s")
+    print(f"  forwards       {result['forwards']} sent, {result['unique_forwarded']} unique, "
+          f"{result['send_failures']} failed, {result['flood_waits']} flood waits")
+    print(f"  scheduler      {result['send_retries']} retries, {result['stale_dropped']} stale dropped")
+    print(f"  dedup          {result['double_forwards']} double forwards, {result['races_blocked']} in-flight races blocked")
+    if result['first_seen']:
+        print(f"  first seen     {result['first_seen']}")
+    print(f"  forward ms     p50={result['forward_p50_ms']} p95={result['forward_p95_ms']} p99={result['forward_p99_ms']}")
+    print(f"  peak memory    {result['peak_memory_mb']} MB")
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    if args.replay:
+        streams = [('replay',) + load_replay(args.replay)]
+    else:
+        names = args.scenario or list(SCENARIOS)
+        streams = [(name,) + SCENARIOS[name](rng) for name in names]
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, channel_count, stream in streams:
+            results.append(await run_stream(name, channel_count, stream, args, workdir))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    parser.add_argument('--replay', help='JSONL file of recorded posts')
+    parser.add_argument('--send-latency', type=float, default=0.05, help='mean send_message latency in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--flood-rate', type=float, default=0.0, help='fraction of sends raising FloodWaitError')
+    parser.add_argument('--targets', type=int, default=1, help='number of autobuy bots to fan out to')
+    parser.add_argument('--concurrency', type=int, default=4, help='send scheduler workers')
+    parser.add_argument('--send-rate', type=float, default=200.0, help='scheduler token bucket rate (sends/s)')
+    parser.add_argument('--max-age', type=float, default=60.0, help='drop CAs older than this many seconds')
+    parser.add_argument('--store', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--bot-delay', type=float, help='also deliver each post via a Bot API source with this mean delay')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print results as JSON for comparing builds')
+    parser.add_argument('--check', action='store_true', help='exit non-zero if any CA was forwarded twice')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print_result(result)
+    if args.check:
+        failed = [result['scenario'] for result in results if result['double_forwards']]
+        if failed:
+            sys.exit(f"double forwards in: {', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
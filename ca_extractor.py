@@ -0,0 +1,87 @@
+import os
+import re
+from collections import namedtuple
+
+ContractAddress = namedtuple('ContractAddress', ['chain', 'address'])
+
+DEFAULT_CA_PATTERN = r'0x[a-fA-F0-9]{40}'
+
+_BASE58 = r'[1-9A-HJ-NP-Za-km-z]'
+_EVM = r'0x[a-fA-F0-9]{40}'
+_SOL = _BASE58 + r'{32,44}'
+_END = r'(?![0-9A-Za-z])'
+
+# Chart / launchpad links. The path segment after dexscreener.com names the chain.
+_URL_PATTERNS = (
+    r'dexscreener\.com/(?P<dex_chain>[a-z]+)/(?P<dex_addr>' + _EVM + '|' + _SOL + ')' + _END,
+    r'dextools\.io/app/(?:[a-z]{2}/)?(?P<dt_chain>[a-z]+)/pair-explorer/(?P<dt_addr>' + _EVM + '|' + _SOL + ')' + _END,
+    r'(?:pump\.fun|birdeye\.so)/(?:coin/|token/)?(?P<pump_addr>' + _SOL + ')' + _END,
+)
+
+# dexscreener / dextools chain slugs that are EVM chains
+EVM_CHAIN_SLUGS = {'ethereum', 'ether', 'eth', 'base', 'bsc', 'arbitrum', 'polygon', 'avalanche', 'optimism', 'blast'}
+
+
+def normalize_address(address):
+    """Return the canonical dedup key for an address (EVM hex is case-insensitive)."""
+    if len(address) == 42 and address[:2] in ('0x', '0X'):
+        return address.lower()
+    return address
+
+
+class AddressExtractor:
+    """Single-pass, multi-chain contract address extractor.
+
+    All patterns are merged into one compiled alternation so each message is
+    scanned exactly once. Results are deduplicated per message (EVM addresses
+    case-insensitively) and keep the order of first appearance.
+    """
+
+    def __init__(self, custom_pattern=None):
+        alternatives = list(_URL_PATTERNS)
+        if custom_pattern and custom_pattern != DEFAULT_CA_PATTERN:
+            alternatives.append(f'(?P<custom>{custom_pattern})')
+        alternatives.append(r'(?<![0-9A-Za-z])(?P<evm>' + _EVM + ')' + _END)
+        alternatives.append(r'(?<![0-9A-Za-z])(?P<sol>' + _SOL + ')' + _END)
+        self.pattern = re.compile('|'.join(alternatives))
+
+    def extract(self, text):
+        """Return a list of ContractAddress found in text."""
+        if not text:
+            return []
+        found = []
+        seen = set()
+        for match in self.pattern.finditer(text):
+            chain, address = _classify(match)
+            key = normalize_address(address)
+            if key in seen:
+                continue
+            seen.add(key)
+            found.append(ContractAddress(chain, address))
+        return found
+
+
+def _classify(match):
+    groups = match.groupdict()
+    if groups['dex_addr']:
+        return _chain_from_slug(groups['dex_chain'], groups['dex_addr']), groups['dex_addr']
+    if groups['dt_addr']:
+        return _chain_from_slug(groups['dt_chain'], groups['dt_addr']), groups['dt_addr']
+    if groups['pump_addr']:
+        return 'solana', groups['pump_addr']
+    if groups.get('custom'):
+        return 'custom', groups['custom']
+    if groups['evm']:
+        return 'evm', groups['evm']
+    return 'solana', groups['sol']
+
+
+def _chain_from_slug(slug, address):
+    if address.startswith('0x'):
+        return slug if slug in EVM_CHAIN_SLUGS else 'evm'
+    return 'solana'
+
+
+def build_extractor(env=os.environ):
+    """Build the extractor from the environment (CA_PATTERN adds a custom pattern)."""
+    return AddressExtractor(env.get('CA_PATTERN'))
@@ -0,0 +1,209 @@
+import os
+from collections import Counter
+from functools import lru_cache
+
+try:
+    from Crypto.Hash import keccak as _fast_keccak  # pycryptodome, if installed
+except ImportError:
+    _fast_keccak = None
+
+BAD_CHECKSUM = 'bad_checksum'
+BAD_ENCODING = 'bad_encoding'
+DENYLISTED = 'denylisted'
+
+# Burn/zero addresses, wrapped natives, stablecoins and programs that get pasted in
+# shill posts but are never a fresh token to buy. EVM entries are lowercase.
+DEFAULT_DENYLIST = frozenset({
+    '0x0000000000000000000000000000000000000000',
+    '0x000000000000000000000000000000000000dead',
+    '0xdead000000000000000042069420694206942069',
+    '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2',  # WETH
+    '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',  # USDC
+    '0xdac17f958d2ee523a2206206994597c13d831ec7',  # USDT
+    '0x6b175474e89094c44da98b954eedeac495271d0f',  # DAI
+    '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599',  # WBTC
+    '0x4200000000000000000000000000000000000006',  # WETH on Base / Optimism
+    '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913',  # USDC on Base
+    '0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c',  # WBNB
+    '0x55d398326f99059ff775485246999027b3197955',  # USDT on BSC
+    '11111111111111111111111111111111',  # system program
+    'So11111111111111111111111111111111111111112',  # wrapped SOL
+    'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v',  # USDC
+    'Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB',  # USDT
+    'TokenkegQfeYyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA',  # SPL token program
+})
+
+# --- Keccak-256 (the pre-SHA3 padding Ethereum uses; hashlib.sha3_256 differs) ---
+
+_MASK = (1 << 64) - 1
+_ROUND_CONSTANTS = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+# Rotation offset for lane x + 5*y
+_ROTATIONS = (
+    0, 1, 62, 28, 27,
+    36, 44, 6, 55, 20,
+    3, 10, 43, 25, 39,
+    41, 45, 15, 21, 8,
+    18, 2, 61, 56, 14,
+)
+# rho+pi: lane i is rotated and moved to _PI[i]; chi combines lane i with the next two in its row
+_PI = tuple(y + 5 * ((2 * x + 3 * y) % 5) for y in range(5) for x in range(5))
+_RHO_PI = tuple((i, _PI[i], _ROTATIONS[i], 64 - _ROTATIONS[i]) for i in range(25))
+_CHI = tuple((i, i - i % 5 + (i + 1) % 5, i - i % 5 + (i + 2) % 5) for i in range(25))
+_RATE = 136
+
+
+def _keccak_f(state):
+    mask = _MASK
+    b = [0] * 25
+    for rc in _ROUND_CONSTANTS:
+        c0 = state[0] ^ state[5] ^ state[10] ^ state[15] ^ state[20]
+        c1 = state[1] ^ state[6] ^ state[11] ^ state[16] ^ state[21]
+        c2 = state[2] ^ state[7] ^ state[12] ^ state[17] ^ state[22]
+        c3 = state[3] ^ state[8] ^ state[13] ^ state[18] ^ state[23]
+        c4 = state[4] ^ state[9] ^ state[14] ^ state[19] ^ state[24]
+        d = (
+            c4 ^ (((c1 << 1) | (c1 >> 63)) & mask),
+            c0 ^ (((c2 << 1) | (c2 >> 63)) & mask),
+            c1 ^ (((c3 << 1) | (c3 >> 63)) & mask),
+            c2 ^ (((c4 << 1) | (c4 >> 63)) & mask),
+            c3 ^ (((c0 << 1) | (c0 >> 63)) & mask),
+        ) * 5
+        for i, dest, rotation, inverse in _RHO_PI:
+            lane = state[i] ^ d[i]
+            b[dest] = ((lane << rotation) | (lane >> inverse)) & mask
+        state = [b[i] ^ (~b[j] & b[k]) for i, j, k in _CHI]
+        state[0] ^= rc
+    return state
+
+
+def keccak256(data):
+    """Keccak-256 digest of bytes (pycryptodome if available, else pure Python)."""
+    if _fast_keccak is not None:
+        return _fast_keccak.new(data=data, digest_bits=256).digest()
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b'\x00' * (-len(padded) % _RATE))
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for offset in range(0, len(padded), _RATE):
+        block = padded[offset:offset + _RATE]
+        for i in range(_RATE // 8):
+            state[i] ^= int.from_bytes(block[i * 8:i * 8 + 8], 'little')
+        state = _keccak_f(state)
+    return b''.join(lane.to_bytes(8, 'little') for lane in state[:4])
+
+
+def to_checksum_address(address):
+    """EIP-55 mixed-case form of a 0x address."""
+    lower = address[2:].lower()
+    digest = keccak256(lower.encode()).hex()
+    return '0x' + ''.join(ch.upper() if int(digest[i], 16) >= 8 else ch for i, ch in enumerate(lower))
+
+
+# --- Base58 (Bitcoin alphabet, as used by Solana) ---
+
+_B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_B58_INDEX = {ch: i for i, ch in enumerate(_B58_ALPHABET)}
+
+
+def b58decode(text):
+    """Decode base58 to bytes; raises ValueError on characters outside the alphabet."""
+    number = 0
+    for ch in text:
+        if ch not in _B58_INDEX:
+            raise ValueError(f"invalid base58 character {ch!r}")
+        number = number * 58 + _B58_INDEX[ch]
+    leading_zeros = len(text) - len(text.lstrip('1'))
+    body = number.to_bytes((number.bit_length() + 7) // 8, 'big') if number else b''
+    return b'\x00' * leading_zeros + body
+
+
+class AddressValidator:
+    """Offline checks between extraction and dispatch.
+
+    - EVM: mixed-case addresses must carry a valid EIP-55 checksum (all
+      lower / all upper case have none and pass).
+    - Solana: must decode from base58 to exactly 32 bytes.
+    - Anything on the denylist (DEFAULT_DENYLIST plus CA_DENYLIST) is
+      rejected; anything on CA_ALLOWLIST is always accepted.
+
+    Verdicts are cached in an LRU, so an address that is spammed repeatedly
+    is only hashed once. `stats` counts accepted addresses and rejections by
+    reason.
+    """
+
+    def __init__(self, denylist=(), allowlist=(), cache_size=4096):
+        self.denylist = {_key(address) for address in DEFAULT_DENYLIST | set(denylist)}
+        self.allowlist = {_key(address) for address in allowlist}
+        self.stats = Counter()
+        self._verdict = lru_cache(maxsize=cache_size)(self._check)
+
+    def _check(self, chain, address):
+        key = _key(address)
+        if key in self.allowlist:
+            return None
+        if key in self.denylist:
+            return DENYLISTED
+        if _is_evm(address):
+            body = address[2:]
+            if body != body.lower() and body != body.upper() and to_checksum_address(address) != address:
+                return BAD_CHECKSUM
+        elif chain != 'custom':
+            try:
+                if len(b58decode(address)) != 32:
+                    return BAD_ENCODING
+            except ValueError:
+                return BAD_ENCODING
+        return None
+
+    def check(self, ca):
+        """Return the rejection reason for a ContractAddress, or None if it passes."""
+        reason = self._verdict(ca.chain, ca.address)
+        self.stats[reason or 'accepted'] += 1
+        return reason
+
+    def filter(self, found):
+        """Split ContractAddresses into (accepted, [(ca, reason), ...])."""
+        accepted, rejected = [], []
+        for ca in found:
+            reason = self.check(ca)
+            if reason is None:
+                accepted.append(ca)
+            else:
+                rejected.append((ca, reason))
+        return accepted, rejected
+
+    def rejected(self):
+        return sum(count for reason, count in self.stats.items() if reason != 'accepted')
+
+    def cache_info(self):
+        return self._verdict.cache_info()
+
+    def prometheus_lines(self):
+        lines = ['# TYPE buybot_ca_validated_total counter']
+        for reason, count in sorted(self.stats.items()):
+            lines.append(f'buybot_ca_validated_total{{verdict="{reason}"}} {count}')
+        return lines
+
+
+def _is_evm(address):
+    return len(address) == 42 and address[:2] in ('0x', '0X')
+
+
+def _key(address):
+    address = address.strip()
+    return address.lower() if _is_evm(address) else address
+
+
+def validator_from_env(env=os.environ):
+    """Build an AddressValidator from CA_DENYLIST and CA_ALLOWLIST (comma-separated)."""
+    def addresses(name):
+        return [address.strip() for address in env.get(name, '').split(',') if address.strip()]
+    return AddressValidator(denylist=addresses('CA_DENYLIST'), allowlist=addresses('CA_ALLOWLIST'))
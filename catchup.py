@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+CHANNEL_STATE_FILE = 'channel_state.json'
+
+
+class LastSeenStore:
+    """Highest message ID seen per channel, persisted to CHANNEL_STATE_FILE.
+
+    update() only touches memory; autosave() writes the file from a worker
+    thread whenever something changed, so the handler never does disk I/O.
+    """
+
+    def __init__(self, path=CHANNEL_STATE_FILE):
+        self.path = path
+        self._last_seen = {}
+        self._dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._last_seen = {int(peer_id): message_id for peer_id, message_id in json.load(f).items()}
+            except (OSError, ValueError):
+                self._last_seen = {}
+
+    def get(self, peer_id):
+        return self._last_seen.get(peer_id)
+
+    def snapshot(self):
+        """Copy of {peer_id: last message ID}; take it before connecting, since live posts move the IDs on."""
+        return dict(self._last_seen)
+
+    def update(self, peer_id, message_id):
+        if message_id > self._last_seen.get(peer_id, 0):
+            self._last_seen[peer_id] = message_id
+            self._dirty = True
+
+    def save(self):
+        snapshot = {str(peer_id): message_id for peer_id, message_id in self._last_seen.items()}
+        self._dirty = False
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.path)
+
+    async def autosave(self, interval=2.0):
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if self._dirty:
+                    await asyncio.to_thread(self.save)
+        finally:
+            if self._dirty:
+                self.save()
+
+
+class RecoveredEvent:
+    """Minimal NewMessage-like event for a message fetched from history."""
+
+    recovered = True
+
+    def __init__(self, client, chat_id, message):
+        self.client = client
+        self.chat_id = chat_id
+        self.message = message
+
+
+async def _fetch_channel(client, channel, min_id, max_age, limit):
+    """Messages newer than min_id and younger than max_age, oldest first."""
+    cutoff = time.time() - max_age if max_age else None
+    messages = []
+    skipped = 0
+    async for message in client.iter_messages(channel.peer_id, min_id=min_id, limit=limit):
+        if cutoff is not None and message.date and message.date.timestamp() < cutoff:
+            skipped += 1
+            break
+        messages.append(message)
+    messages.reverse()
+    return messages, skipped
+
+
+async def recover_gaps(client, registry, last_seen, handle, max_age=60.0, limit=500, concurrency=4):
+    """Replay messages posted while we were offline through `handle`.
+
+    `last_seen` is a LastSeenStore or a snapshot() of one taken before the
+    client connected; live posts handled since then must not hide the gap.
+    For every channel with a stored last-seen ID, history after that ID is
+    fetched (iter_messages pages in batches of 100) concurrently across
+    channels, then each message is passed to handle() like a live event.
+    Messages older than max_age seconds are skipped. Returns a report dict.
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    report = {'channels': 0, 'recovered': 0, 'too_old': 0, 'errors': {}, 'seconds': 0.0,
+              'at': datetime.now(timezone.utc).isoformat()}
+
+    async def catch_up_channel(channel):
+        min_id = last_seen.get(channel.peer_id)
+        if not min_id:
+            return
+        async with semaphore:
+            try:
+                messages, skipped = await _fetch_channel(client, channel, min_id, max_age, limit)
+            except Exception as e:
+                report['errors'][channel.name] = str(e)
+                return
+        report['channels'] += 1
+        report['too_old'] += skipped
+        for message in messages:
+            report['recovered'] += 1
+            await handle(RecoveredEvent(client, channel.peer_id, message))
+
+    await asyncio.gather(*(catch_up_channel(channel) for channel in registry.resolved() if channel.enabled))
+    report['seconds'] = time.perf_counter() - started
+    return report
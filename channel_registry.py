@@ -0,0 +1,164 @@
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass
+
+from telethon import utils
+from telethon.tl.functions.messages import CheckChatInviteRequest
+from telethon.tl.types import ChatInviteAlready, ChatInvitePeek
+
+CHANNEL_CACHE_FILE = 'channel_cache.json'
+
+_INVITE_RE = re.compile(r'(?:https?://)?(?:t\.me|telegram\.me)/(?:\+|joinchat/)([\w-]+)')
+_USERNAME_RE = re.compile(r'(?:https?://)?(?:t\.me/|@)?([A-Za-z][\w]{3,31})$')
+
+
+@dataclass
+class Channel:
+    """A configured channel and, once resolved, its numeric peer ID."""
+    spec: str
+    priority: int = 0
+    enabled: bool = True
+    peer_id: int = None
+    username: str = None
+    title: str = None
+
+    @property
+    def name(self):
+        if self.username:
+            return f"@{self.username}"
+        return self.title or self.spec
+
+
+def parse_channel_spec(entry):
+    """Parse one TARGET_CHANNELS entry.
+
+    Accepted forms: ``@name``, ``name``, ``-100123...``, ``https://t.me/+hash``.
+    A ``:N`` suffix sets the priority and a leading ``!`` disables the channel.
+    """
+    entry = entry.strip()
+    enabled = not entry.startswith('!')
+    entry = entry.lstrip('!').strip()
+    priority = 0
+    head, sep, tail = entry.rpartition(':')
+    if sep and tail.strip().lstrip('-').isdigit():
+        entry, priority = head.strip(), int(tail)
+    return Channel(spec=entry, priority=priority, enabled=enabled)
+
+
+class ChannelRegistry:
+    """Resolve configured channels to peer IDs once and look them up by chat_id.
+
+    Resolved peers are persisted to CHANNEL_CACHE_FILE so a restart can
+    filter by ID before the client has even connected (see load_cached()).
+    """
+
+    def __init__(self, entries, cache_file=CHANNEL_CACHE_FILE):
+        self.cache_file = cache_file
+        self.channels = [parse_channel_spec(entry) for entry in entries if entry.strip()]
+        self._by_peer_id = {}
+        self.errors = {}
+
+    @classmethod
+    def from_env(cls, cache_file=CHANNEL_CACHE_FILE, env=os.environ):
+        return cls(env.get('TARGET_CHANNELS', '').split(','), cache_file=cache_file)
+
+    def get(self, chat_id):
+        """Return the enabled Channel for chat_id, or None."""
+        channel = self._by_peer_id.get(chat_id)
+        if channel is not None and channel.enabled:
+            return channel
+        return None
+
+    def peer_ids(self):
+        return [channel.peer_id for channel in self.channels if channel.peer_id is not None and channel.enabled]
+
+    def resolved(self):
+        return [channel for channel in self.channels if channel.peer_id is not None]
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        cache = {
+            channel.spec: {'peer_id': channel.peer_id, 'username': channel.username, 'title': channel.title}
+            for channel in self.resolved()
+        }
+        tmp = self.cache_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, self.cache_file)
+
+    def load_cached(self):
+        """Fill in peer IDs from the on-disk cache without any network calls."""
+        cache = self._load_cache()
+        for channel in self.channels:
+            cached = cache.get(channel.spec)
+            if channel.peer_id is None and cached and cached.get('peer_id') is not None:
+                channel.peer_id = cached['peer_id']
+                channel.username = cached.get('username')
+                channel.title = cached.get('title')
+        self._by_peer_id = {channel.peer_id: channel for channel in self.resolved()}
+        return self
+
+    def invalid_specs(self):
+        """Specs that are not a username, numeric ID or invite link."""
+        return [
+            channel.spec for channel in self.channels
+            if not (_INVITE_RE.match(channel.spec) or channel.spec.lstrip('-').isdigit() or _USERNAME_RE.match(channel.spec))
+        ]
+
+    def unresolved(self):
+        return [channel for channel in self.channels if channel.peer_id is None]
+
+    async def resolve(self, client):
+        """Resolve every channel not already known from the cache, concurrently."""
+        self.load_cached()
+        pending = self.unresolved()
+        results = await asyncio.gather(
+            *(self._resolve_entity(client, channel.spec) for channel in pending),
+            return_exceptions=True,
+        )
+        for channel, entity in zip(pending, results):
+            if isinstance(entity, Exception):
+                self.errors[channel.spec] = str(entity)
+                continue
+            channel.peer_id = utils.get_peer_id(entity)
+            channel.username = getattr(entity, 'username', None)
+            channel.title = getattr(entity, 'title', None)
+        self._by_peer_id = {channel.peer_id: channel for channel in self.resolved()}
+        if pending:
+            self._save_cache()
+        return self
+
+    def learn(self, spec, peer_id, username=None, title=None):
+        """Record a resolution made elsewhere (e.g. by a shard worker's session)."""
+        for channel in self.channels:
+            if channel.spec == spec and channel.peer_id is None:
+                channel.peer_id, channel.username, channel.title = peer_id, username, title
+                self._by_peer_id[peer_id] = channel
+                self.errors.pop(spec, None)
+                self._save_cache()
+                return channel
+        return None
+
+    async def _resolve_entity(self, client, spec):
+        invite = _INVITE_RE.match(spec)
+        if invite:
+            result = await client(CheckChatInviteRequest(invite.group(1)))
+            if isinstance(result, (ChatInviteAlready, ChatInvitePeek)):
+                return result.chat
+            raise ValueError(f"not a member of invite-link channel {spec}")
+        if spec.lstrip('-').isdigit():
+            return await client.get_entity(int(spec))
+        username = _USERNAME_RE.match(spec)
+        if not username:
+            raise ValueError(f"unrecognised channel {spec}")
+        return await client.get_entity(username.group(1))
@@ -0,0 +1,33 @@
+import asyncio
+import sys
+import threading
+
+
+class CommandReader:
+    """Read command lines from stdin on a daemon thread.
+
+    Lines are handed to the event loop through an asyncio.Queue, so waiting
+    for input never pauses rendering or update handling. None marks EOF.
+    """
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self._loop = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read, name='command-reader', daemon=True).start()
+
+    def _read(self):
+        while True:
+            try:
+                line = sys.stdin.readline()
+            except (OSError, ValueError):
+                line = ''
+            if not line:
+                self._loop.call_soon_threadsafe(self.queue.put_nowait, None)
+                return
+            self._loop.call_soon_threadsafe(self.queue.put_nowait, line.rstrip('\n'))
+
+    async def get(self):
+        return await self.queue.get()
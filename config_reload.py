@@ -0,0 +1,164 @@
+import asyncio
+import os
+import re
+
+from dotenv import dotenv_values
+
+from ca_extractor import build_extractor
+from ca_validator import validator_from_env
+from channel_registry import ChannelRegistry, CHANNEL_CACHE_FILE
+from forward_targets import ForwardTargets
+
+CONFIG_FILE = '.env'
+# Settings that can change without a restart
+RELOADABLE = ('TARGET_CHANNELS', 'CA_PATTERN', 'FORWARD_TARGETS', 'AUTOBUY_BOT_USERNAME', 'FORWARD_ROUTES',
+              'CA_DENYLIST', 'CA_ALLOWLIST')
+
+
+class ConfigError(ValueError):
+    """A reloaded config failed validation; `problems` lists every reason."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("; ".join(problems))
+
+
+class Config:
+    """Channel registry, extractor, validator and forward targets built from one snapshot of settings."""
+
+    def __init__(self, values, registry, extractor, validator, targets):
+        self.values = values
+        self.registry = registry
+        self.extractor = extractor
+        self.validator = validator
+        self.targets = targets
+
+
+def load_config(env, cache_file=CHANNEL_CACHE_FILE):
+    """Build and validate a Config from env; raises ConfigError listing every problem."""
+    problems = []
+    registry = ChannelRegistry.from_env(cache_file, env=env)
+    if not registry.channels:
+        problems.append("TARGET_CHANNELS is empty")
+    problems.extend(f"unrecognised channel {spec!r}" for spec in registry.invalid_specs())
+    extractor = None
+    try:
+        re.compile(env.get('CA_PATTERN') or '')  # alone first, so error positions refer to CA_PATTERN itself
+        extractor = build_extractor(env)
+    except re.error as e:
+        problems.append(f"CA_PATTERN does not compile: {e}")
+    targets = ForwardTargets.from_env(env)
+    if not targets.all_targets():
+        problems.append("no forward targets (FORWARD_TARGETS / AUTOBUY_BOT_USERNAME)")
+    if problems:
+        raise ConfigError(problems)
+    return Config({key: env.get(key) for key in RELOADABLE}, registry, extractor, validator_from_env(env), targets)
+
+
+def describe_changes(old, new):
+    """One-line summary of what differs between two Config.values dicts."""
+    changes = []
+    old_specs = {spec.strip() for spec in (old.get('TARGET_CHANNELS') or '').split(',') if spec.strip()}
+    new_specs = {spec.strip() for spec in (new.get('TARGET_CHANNELS') or '').split(',') if spec.strip()}
+    if new_specs - old_specs:
+        changes.append(f"+channels {', '.join(sorted(new_specs - old_specs))}")
+    if old_specs - new_specs:
+        changes.append(f"-channels {', '.join(sorted(old_specs - new_specs))}")
+    if old.get('CA_PATTERN') != new.get('CA_PATTERN'):
+        changes.append("CA_PATTERN")
+    if any(old.get(key) != new.get(key) for key in ('FORWARD_TARGETS', 'AUTOBUY_BOT_USERNAME', 'FORWARD_ROUTES')):
+        changes.append("targets/routes")
+    if any(old.get(key) != new.get(key) for key in ('CA_DENYLIST', 'CA_ALLOWLIST')):
+        changes.append("deny/allowlist")
+    return ", ".join(changes) or "no changes"
+
+
+class ConfigReloader:
+    """Re-read RELOADABLE settings from `path` when it changes or on request.
+
+    The file is polled every `interval` seconds (an os.stat, so it costs
+    nothing). A new config is validated and handed to apply(config), which
+    resolves it and swaps it in; until apply returns the old config stays
+    live, and an invalid file is reported and ignored. Values in the file
+    win over the process environment, and a key deleted from the file
+    reverts to unset.
+    """
+
+    def __init__(self, apply, path=CONFIG_FILE, status_callback=None, interval=2.0, cache_file=CHANNEL_CACHE_FILE):
+        self.apply = apply
+        self.path = path
+        self.status_callback = status_callback
+        self.interval = interval
+        self.cache_file = cache_file
+        self.reloads = 0
+        self.rejected = 0
+        self._lock = asyncio.Lock()
+        self._mtime = self._stat()
+        self._file_keys = set(self._read_file())
+        self._applied = {key: os.environ.get(key) for key in RELOADABLE}
+        self._task = None
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_file(self):
+        if not os.path.exists(self.path):
+            return {}
+        return {key: value for key, value in dotenv_values(self.path).items() if value is not None}
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            mtime = self._stat()
+            if mtime != self._mtime:
+                self._mtime = mtime
+                await self.reload(f"{self.path} changed")
+
+    def request(self, reason="command"):
+        """Start a reload from synchronous code (e.g. the /reload command)."""
+        self._task = asyncio.create_task(self.reload(reason))
+
+    async def reload(self, reason):
+        """Returns True if a new config was applied."""
+        async with self._lock:
+            file_values = self._read_file()
+            env = dict(os.environ)
+            for key in self._file_keys - set(file_values):
+                env.pop(key, None)
+            env.update(file_values)
+            try:
+                config = load_config(env, self.cache_file)
+            except ConfigError as e:
+                self.rejected += 1
+                self._report(f"Config reload ({reason}) rejected, keeping the current config:", "error")
+                for problem in e.problems:
+                    self._report(f"   - {problem}", "error")
+                return False
+            if config.values == self._applied:
+                self._file_keys = set(file_values)
+                self._report(f"Config reload ({reason}): no changes", "info")
+                return False
+            changes = describe_changes(self._applied, config.values)
+            try:
+                await self.apply(config)
+            except Exception as e:
+                self.rejected += 1
+                self._report(f"Config reload ({reason}) failed, keeping the current config: {e}", "error")
+                return False
+            for key, value in config.values.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            self._file_keys = set(file_values)
+            self._applied = config.values
+            self.reloads += 1
+            self._report(f"Config reloaded ({reason}): {changes}", "success")
+            return True
+
+    def _report(self, message, status_type):
+        if self.status_callback:
+            self.status_callback(message, status_type)
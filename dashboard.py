@@ -0,0 +1,70 @@
+import asyncio
+
+from rich.layout import Layout
+from rich.live import Live
+
+
+class Dashboard:
+    """A single long-lived, rate-limited full-screen dashboard.
+
+    Panels are registered with a render function and a version function.
+    On each tick only panels whose version changed are re-rendered, and the
+    screen is refreshed only if something changed, at most once per
+    `interval` seconds. A panel without a version function is rendered once.
+    """
+
+    def __init__(self, console, interval=0.5):
+        self.console = console
+        self.interval = interval
+        self.layout = Layout()
+        self._panels = []
+        self._versions = {}
+        self._task = None
+
+    def add_panel(self, name, render, version=None, size=None):
+        self._panels.append((name, render, version, size))
+
+    def _build(self):
+        self.layout.split_column(*(
+            Layout(render(), name=name, size=size() if callable(size) else size) for name, render, _, size in self._panels
+        ))
+        for name, _, version, _ in self._panels:
+            self._versions[name] = version() if version else None
+
+    def _update(self):
+        changed = False
+        for name, render, version, size in self._panels:
+            if version is None:
+                continue
+            current = version()
+            if current == self._versions[name]:
+                continue
+            self._versions[name] = current
+            panel = self.layout[name]
+            panel.update(render())
+            if size is not None and callable(size):
+                panel.size = size()
+            changed = True
+        return changed
+
+    async def run(self):
+        self._build()
+        with Live(self.layout, console=self.console, screen=True, auto_refresh=False) as live:
+            live.refresh()
+            while True:
+                await asyncio.sleep(self.interval)
+                if self._update():
+                    live.refresh()
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,275 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from ca_extractor import normalize_address
+
+LEGACY_CONTRACTS_FILE = 'processed_contracts.txt'
+DEFAULT_STORE_PATH = 'processed_contracts.db'
+RETRY_INTERVAL = 1.0  # seconds between attempts to commit a batch that failed
+
+# A child of the event log's logger, so writer-thread errors land in events.jsonl
+logger = logging.getLogger('buybot.dedup')
+
+
+class DedupStore:
+    """Interface for the processed-contract store.
+
+    Addresses are normalized before lookup, so 0xAbc.. and 0xabc.. are the
+    same contract. Implementations must make seen() cheap enough to call on
+    the event loop and must not block in add().
+    """
+
+    def seen(self, ca):
+        raise NotImplementedError
+
+    def add(self, ca, channel=None):
+        raise NotImplementedError
+
+    def __contains__(self, ca):
+        return self.seen(ca)
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def flush(self):
+        """Block until every add() so far is durable."""
+
+    def close(self):
+        pass
+
+    def prometheus_lines(self):
+        return []
+
+
+class MemoryDedupStore(DedupStore):
+    """Process-local store with optional TTL; nothing is persisted."""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._entries = {}
+
+    def seen(self, ca):
+        expires_at = self._entries.get(normalize_address(ca), 0)
+        return expires_at is None or expires_at > time.time()
+
+    def add(self, ca, channel=None):
+        self._entries[normalize_address(ca)] = time.time() + self.ttl if self.ttl else None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteDedupStore(DedupStore):
+    """SQLite (WAL) backed store with group-committed writes.
+
+    Lookups hit an in-process cache first and then the primary-key index, so
+    they stay flat as history grows and nothing is loaded at startup. add()
+    records the address in the cache and hands the row to a writer thread
+    that commits whatever has queued up in a single transaction. WAL mode plus
+    a busy timeout lets several monitor processes share one database file.
+    A batch that fails to commit is logged, counted and retried with the
+    next one rather than dropped.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, ttl=None, flush_interval=0.05,
+                 legacy_file=LEGACY_CONTRACTS_FILE):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._cache = {}
+        self._pending = queue.SimpleQueue()
+        self._flushed = threading.Condition()
+        self._enqueued = 0
+        self._committed = 0
+        self._closed = False
+        self.stats = Counter()
+
+        self._reader = self._connect()
+        self._reader.executescript("""
+            CREATE TABLE IF NOT EXISTS contracts (
+                address    TEXT PRIMARY KEY,
+                first_seen REAL NOT NULL,
+                channel    TEXT,
+                expires_at REAL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self._import_legacy(legacy_file)
+
+        self._writer = threading.Thread(target=self._write_loop, name='dedup-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _import_legacy(self, legacy_file):
+        """Import processed_contracts.txt once, the first time the database is opened."""
+        done = self._reader.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+        if done or not legacy_file or not os.path.exists(legacy_file):
+            return
+        now = time.time()
+        with open(legacy_file, 'r') as f:
+            rows = [(normalize_address(line.strip()), now, 'legacy') for line in f if line.strip()]
+        self._reader.execute('BEGIN IMMEDIATE')
+        self._reader.executemany(
+            'INSERT OR IGNORE INTO contracts (address, first_seen, channel, expires_at) VALUES (?, ?, ?, NULL)',
+            rows,
+        )
+        self._reader.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(now),))
+        self._reader.execute('COMMIT')
+
+    def seen(self, ca):
+        """True if ca was processed (and hasn't expired).
+
+        A cache miss is a synchronous primary-key read on the caller's thread
+        (the event loop). It costs tens of microseconds, and in WAL mode it
+        doesn't wait for the writer. Misses are mostly new addresses, and a
+        hit is cached.
+        """
+        key = normalize_address(ca)
+        now = time.time()
+        if key in self._cache:
+            expires_at = self._cache[key]
+            if expires_at is None or expires_at > now:
+                return True
+        row = self._reader.execute(
+            'SELECT expires_at FROM contracts WHERE address = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return False
+        expires_at = row[0]
+        if expires_at is not None and expires_at <= now:
+            return False
+        self._cache[key] = expires_at
+        return True
+
+    def add(self, ca, channel=None):
+        key = normalize_address(ca)
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        self._cache[key] = expires_at
+        self._enqueued += 1
+        self._pending.put((key, now, channel, expires_at))
+
+    def __len__(self):
+        return self._reader.execute('SELECT COUNT(*) FROM contracts').fetchone()[0]
+
+    def _write_loop(self):
+        conn = self._connect()
+        rows = []  # rows of a batch that failed to commit ride along with the next one
+        stop = False
+        while not stop:
+            try:
+                row = self._pending.get(timeout=RETRY_INTERVAL) if rows else self._pending.get()
+            except queue.Empty:
+                row = ()  # nothing new; just retry the held rows
+            if row is None:
+                stop = True
+            elif row:
+                rows.append(row)
+                time.sleep(self.flush_interval)
+                while True:
+                    try:
+                        row = self._pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    if row is None:
+                        stop = True
+                        break
+                    rows.append(row)
+            if rows and self._commit(conn, rows):
+                rows = []
+        if rows:
+            logger.error('dedup store closed with %d uncommitted rows', len(rows))
+        conn.close()
+
+    def _commit(self, conn, rows):
+        """Write one batch; returns False (logged and counted) if it couldn't be committed."""
+        committed = False
+        error = None
+        try:
+            for attempt in range(5):
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.executemany("""
+                        INSERT INTO contracts (address, first_seen, channel, expires_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(address) DO UPDATE SET
+                            first_seen = excluded.first_seen,
+                            channel = excluded.channel,
+                            expires_at = excluded.expires_at
+                        WHERE contracts.expires_at IS NOT NULL AND contracts.expires_at <= excluded.first_seen
+                    """, rows)
+                    conn.execute('COMMIT')
+                    committed = True
+                    break
+                except sqlite3.OperationalError as e:  # locked by another process
+                    error = e
+                    self._rollback(conn)
+                    time.sleep(0.1 * (attempt + 1))
+        except Exception as e:
+            error = e
+            self._rollback(conn)
+        finally:
+            # Always wake flush(), whether or not the batch made it
+            with self._flushed:
+                if committed:
+                    self._committed += len(rows)
+                else:
+                    self.stats['commit_failures'] += 1
+                self._flushed.notify_all()
+        if not committed:
+            logger.error('dedup store commit of %d rows failed, will retry: %s', len(rows), error)
+        return committed
+
+    @staticmethod
+    def _rollback(conn):
+        if conn.in_transaction:
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+
+    def flush(self):
+        """Block until every add() so far is durable; returns False if a commit failed meanwhile."""
+        target = self._enqueued
+        with self._flushed:
+            failures = self.stats['commit_failures']
+            self._flushed.wait_for(lambda: self._committed >= target or self.stats['commit_failures'] > failures
+                                   or not self._writer.is_alive())
+            return self._committed >= target
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.put(None)
+        self._writer.join()
+        self._reader.close()
+
+    def prometheus_lines(self):
+        return [
+            '# TYPE buybot_dedup_commit_failures_total counter',
+            f"buybot_dedup_commit_failures_total {self.stats['commit_failures']}",
+        ]
+
+
+def open_dedup_store():
+    """Open the store configured by DEDUP_STORE (a path or 'memory') and DEDUP_TTL_HOURS."""
+    ttl_hours = os.getenv('DEDUP_TTL_HOURS')
+    ttl = float(ttl_hours) * 3600 if ttl_hours else None
+    target = os.getenv('DEDUP_STORE', DEFAULT_STORE_PATH)
+    if target == 'memory':
+        return MemoryDedupStore(ttl=ttl)
+    return SQLiteDedupStore(target, ttl=ttl)
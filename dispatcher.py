@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from collections import Counter, deque, namedtuple
+
+from ca_extractor import normalize_address
+
+FORWARDED = 'forwarded'
+DUPLICATE = 'duplicate'
+IN_FLIGHT = 'in_flight'
+FAILED = 'failed'
+
+DispatchResult = namedtuple('DispatchResult', ['ca', 'status', 'source', 'winner', 'error', 'claimed_at', 'finished_at'])
+Race = namedtuple('Race', ['ca', 'winner', 'loser', 'at'])
+
+
+class Dispatcher:
+    """Claim contract addresses atomically and forward them concurrently.
+
+    claim() runs synchronously on the event loop, so checking the dedup store
+    and registering the address as in flight cannot interleave with another
+    handler. The claim is committed to the dedup store when the send succeeds
+    and released when it fails, so a failed send can be retried by the next
+    post. Sends from all messages share one concurrency limit; pass
+    max_concurrency=None when `send` is already limited (e.g. by a
+    SendScheduler).
+    """
+
+    def __init__(self, dedup_store, max_concurrency=4, race_history=100):
+        self.dedup_store = dedup_store
+        self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._in_flight = {}
+        self.races = deque(maxlen=race_history)
+        self.race_wins = Counter()
+        self.stats = Counter()
+
+    def in_flight(self):
+        return len(self._in_flight)
+
+    def claim(self, ca, source):
+        """Reserve ca for source. Returns (claimed, winner)."""
+        key = normalize_address(ca)
+        winner = self._in_flight.get(key)
+        if winner is not None:
+            self.races.append(Race(ca, winner, source, time.time()))
+            self.race_wins[winner] += 1
+            return False, winner
+        if self.dedup_store.seen(key):
+            return False, None
+        self._in_flight[key] = source
+        return True, source
+
+    def commit(self, ca, source):
+        key = normalize_address(ca)
+        self._in_flight.pop(key, None)
+        self.dedup_store.add(key, source)
+
+    def release(self, ca):
+        self._in_flight.pop(normalize_address(ca), None)
+
+    async def dispatch(self, cas, source, send):
+        """Forward every address in cas via `await send(ca)`; returns DispatchResults in order."""
+        return await asyncio.gather(*(self._dispatch_one(ca, source, send) for ca in cas))
+
+    async def _dispatch_one(self, ca, source, send):
+        claimed, winner = self.claim(ca, source)
+        claimed_at = time.time()
+        if not claimed:
+            status = IN_FLIGHT if winner is not None else DUPLICATE
+            self.stats[status] += 1
+            return DispatchResult(ca, status, source, winner, None, claimed_at, claimed_at)
+        try:
+            if self.semaphore is None:
+                await send(ca)
+            else:
+                async with self.semaphore:
+                    await send(ca)
+        except Exception as e:
+            self.release(ca)
+            self.stats[FAILED] += 1
+            return DispatchResult(ca, FAILED, source, source, e, claimed_at, time.time())
+        except asyncio.CancelledError:
+            self.release(ca)
+            raise
+        self.commit(ca, source)
+        self.stats[FORWARDED] += 1
+        return DispatchResult(ca, FORWARDED, source, source, None, claimed_at, time.time())
+
+
+def dispatch_concurrency():
+    """DISPATCH_CONCURRENCY from the environment (default 4)."""
+    return int(os.getenv('DISPATCH_CONCURRENCY', '4'))
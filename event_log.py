@@ -0,0 +1,205 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from colorama import Fore, Style
+
+EVENT_LOG_FILE = 'events.jsonl'
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+
+class ColoredFormatter(logging.Formatter):
+    """Custom formatter with colors"""
+    grey = Fore.WHITE
+    blue = Fore.CYAN
+    yellow = Fore.YELLOW
+    red = Fore.RED
+    bold_red = Fore.RED + Style.BRIGHT
+    reset = Style.RESET_ALL
+
+    def __init__(self, fmt):
+        super().__init__()
+        self.fmt = fmt
+        # One formatter per level, built once rather than per record
+        self.FORMATS = {
+            logging.DEBUG: logging.Formatter(self.grey + self.fmt + self.reset),
+            logging.INFO: logging.Formatter(self.blue + self.fmt + self.reset),
+            logging.WARNING: logging.Formatter(self.yellow + self.fmt + self.reset),
+            logging.ERROR: logging.Formatter(self.red + self.fmt + self.reset),
+            logging.CRITICAL: logging.Formatter(self.bold_red + self.fmt + self.reset),
+        }
+
+    def format(self, record):
+        return self.FORMATS.get(record.levelno, self.FORMATS[logging.INFO]).format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, event, msg plus the record's fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'event': getattr(record, 'event', 'log'),
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _gzip_rotate(source, dest):
+    if not os.path.exists(source):
+        return
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotate at `max_bytes` or every `rotate_seconds`, whichever comes first; backups are gzipped."""
+
+    def __init__(self, filename, max_bytes=0, backup_count=10, rotate_seconds=None):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.rotate_seconds = rotate_seconds
+        self.rollover_at = time.time() + rotate_seconds if rotate_seconds else None
+        self.namer = lambda name: name + '.gz'
+        self.rotator = _gzip_rotate
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+            self.rollover_at = time.time() + self.rotate_seconds  # nothing to rotate yet
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.rotate_seconds:
+            self.rollover_at = time.time() + self.rotate_seconds
+
+
+def queue_logger(logger, *handlers):
+    """Put `handlers` behind a queue on `logger`; returns the started QueueListener.
+
+    Emitting becomes a put_nowait, and formatting and I/O happen on the
+    listener's thread.
+    """
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class _EventListener(QueueListener):
+    """QueueListener that also accepts the (name, level, message, event, fields, created)
+    tuples EventLog queues, turning them into LogRecords on the listener thread."""
+
+    def prepare(self, item):
+        if not isinstance(item, tuple):
+            return item  # a LogRecord from the QueueHandler
+        name, level, message, event, fields, created = item
+        record = logging.LogRecord(name, level, '', 0, message, None, None)
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        record.event = event
+        record.fields = fields
+        return record
+
+
+class EventLog:
+    """Non-blocking structured log for the monitor.
+
+    Records go through a QueueHandler to a listener thread that writes JSONL
+    to `path` (rotated and gzipped by CompressingRotatingFileHandler) and,
+    with console=True, colored lines to the terminal. The level can be
+    changed while running. audit() records buy decisions on a separate
+    logger pinned to INFO, so the audit trail is complete at any level.
+    """
+
+    def __init__(self, path=EVENT_LOG_FILE, level='INFO', max_bytes=20 * 1024 * 1024, backup_count=10,
+                 rotate_seconds=24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.logger = logging.getLogger('buybot')
+        self.logger.propagate = False
+        self.audit_logger = logging.getLogger('buybot.audit')
+        self.audit_logger.setLevel(logging.INFO)
+        self._queue = queue.SimpleQueue()
+        self.logger.handlers = [QueueHandler(self._queue)]
+        self._listener = None
+        self._handlers = []
+        self.set_level(level)
+
+    def start(self, console=False):
+        """Start the writer thread; records logged before this are kept and written now."""
+        if self._listener is not None:
+            return
+        if self.path:
+            handler = CompressingRotatingFileHandler(self.path, self.max_bytes, self.backup_count, self.rotate_seconds)
+            handler.setFormatter(JsonFormatter())
+            self._handlers.append(handler)
+        if console:
+            handler = logging.StreamHandler()
+            handler.setFormatter(ColoredFormatter('%(asctime)s - %(levelname)s - %(message)s'))
+            # Decisions are already shown as status lines
+            handler.addFilter(lambda record: record.name != self.audit_logger.name)
+            self._handlers.append(handler)
+        self._listener = _EventListener(self._queue, *self._handlers, respect_handler_level=True)
+        self._listener.start()
+
+    def stop(self):
+        """Flush everything queued and close the files."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        for handler in self._handlers:
+            handler.close()
+        self._handlers = []
+
+    def set_level(self, level):
+        """Set the level by name (DEBUG, INFO, WARNING, ERROR); raises ValueError if unknown."""
+        name = str(level).upper()
+        if name not in LEVELS:
+            raise ValueError(f"unknown log level {level!r} (use one of {', '.join(LEVELS)})")
+        self.logger.setLevel(name)
+        return name
+
+    @property
+    def level(self):
+        return logging.getLevelName(self.logger.level)
+
+    def _emit(self, logger, level, message, event, fields):
+        # Only a tuple is built here; the LogRecord, formatting and I/O all happen on the
+        # listener thread (logger.log would also walk the stack and copy the record)
+        if logger.isEnabledFor(level):
+            self._queue.put_nowait((logger.name, level, message, event, fields, time.time()))
+
+    def log(self, level, message, event='status', **fields):
+        self._emit(self.logger, level, message, event, fields)
+
+    def debug(self, event, message, **fields):
+        self._emit(self.logger, logging.DEBUG, message, event, fields)
+
+    def audit(self, decision, **fields):
+        """Record one buy decision (forwarded, duplicate, in_flight, failed, rejected)."""
+        self._emit(self.audit_logger, logging.INFO, decision, 'decision', {'decision': decision, **fields})
+
+
+def event_log_from_env():
+    """EventLog configured by EVENT_LOG, LOG_LEVEL, EVENT_LOG_MAX_MB, EVENT_LOG_ROTATE_HOURS and EVENT_LOG_BACKUPS."""
+    return EventLog(
+        path=os.getenv('EVENT_LOG', EVENT_LOG_FILE),
+        level=os.getenv('LOG_LEVEL', 'INFO'),
+        max_bytes=int(float(os.getenv('EVENT_LOG_MAX_MB', '20')) * 1024 * 1024),
+        backup_count=int(os.getenv('EVENT_LOG_BACKUPS', '10')),
+        rotate_seconds=float(os.getenv('EVENT_LOG_ROTATE_HOURS', '24')) * 3600 or None,
+    )
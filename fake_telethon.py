@@ -0,0 +1,107 @@
+"""In-process stand-ins for the parts of Telethon the monitor touches.
+
+Used by bench_replay.py to drive handle_new_message without a network
+connection. send_message latency, failure rate and FloodWait rate are
+configurable.
+"""
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+
+from telethon.errors import FloodWaitError
+from telethon.tl.types import Channel as ChannelEntity
+
+
+class FakeMessage:
+    def __init__(self, message_id, text, date=None, entities=None, reply_markup=None):
+        self.id = message_id
+        self.text = text
+        self.raw_text = text
+        self.message = text
+        self.date = date or datetime.now(timezone.utc)
+        self.edit_date = None
+        self.entities = entities
+        self.reply_markup = reply_markup
+
+    def edit(self, text, date=None):
+        """Change the text in place, as a channel admin editing the post would."""
+        self.text = self.raw_text = self.message = text
+        self.edit_date = date or datetime.now(timezone.utc)
+        return self
+
+
+class FakeEvent:
+    def __init__(self, client, chat_id, message):
+        self.client = client
+        self.chat_id = chat_id
+        self.message = message
+
+    async def get_chat(self):
+        return await self.client.get_entity(self.chat_id)
+
+
+class FakeClient:
+    """Records send_message calls and simulates Telegram's behaviour."""
+
+    def __init__(self, send_latency=0.05, jitter=0.02, failure_rate=0.0,
+                 flood_wait_rate=0.0, flood_wait_seconds=1, seed=1):
+        self.send_latency = send_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.flood_wait_rate = flood_wait_rate
+        self.flood_wait_seconds = flood_wait_seconds
+        self.rng = random.Random(seed)
+        self.sent = []
+        self.failures = 0
+        self.flood_waits = 0
+        self.channels = {}
+        self.history = {}
+
+    def add_channel(self, peer_id, username=None, title=None):
+        """Register a fake channel; peer_id is the marked (-100...) ID."""
+        channel_id = int(str(-peer_id)[3:]) if peer_id < 0 else peer_id
+        self.channels[peer_id] = ChannelEntity(
+            id=channel_id, title=title or username or str(peer_id), photo=None,
+            date=None, username=username, broadcast=True,
+        )
+        return self.channels[peer_id]
+
+    async def get_entity(self, target):
+        if isinstance(target, int):
+            return self.channels[target]
+        for entity in self.channels.values():
+            if entity.username == str(target).lstrip('@'):
+                return entity
+        raise ValueError(f"No fake entity for {target}")
+
+    def post(self, peer_id, text, date=None):
+        """Append a message to a fake channel's history and return it."""
+        history = self.history.setdefault(peer_id, [])
+        message = FakeMessage(len(history) + 1, text, date)
+        history.append(message)
+        return message
+
+    async def iter_messages(self, entity, min_id=0, limit=None, offset_id=0, wait_time=None):
+        """Newest-first history after min_id (and before offset_id), like TelegramClient.iter_messages."""
+        count = 0
+        for message in reversed(self.history.get(entity, [])):
+            if offset_id and message.id >= offset_id:
+                continue
+            if message.id <= min_id or (limit is not None and count >= limit):
+                return
+            count += 1
+            yield message
+
+    async def send_message(self, entity, message):
+        delay = max(0.0, self.send_latency + self.rng.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(delay)
+        roll = self.rng.random()
+        if roll < self.flood_wait_rate:
+            self.flood_waits += 1
+            raise FloodWaitError(request=None, capture=self.flood_wait_seconds)
+        if roll < self.flood_wait_rate + self.failure_rate:
+            self.failures += 1
+            raise ConnectionError("simulated send failure")
+        self.sent.append((time.monotonic(), entity, message))
+        return FakeMessage(len(self.sent), message)
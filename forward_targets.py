@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+from collections import Counter, defaultdict, deque
+
+
+class FanOutError(Exception):
+    """Every target failed; `errors` maps target -> exception."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"@{target}: {error}" for target, error in errors.items()))
+
+
+def _key(name):
+    return str(name).strip().lstrip('@').lower()
+
+
+def parse_routes(spec):
+    """Parse FORWARD_ROUTES: ``@chanA>bot1|bot2;@chanB>bot3`` -> {'chana': ['bot1', 'bot2'], ...}."""
+    routes = {}
+    for rule in (spec or '').split(';'):
+        if '>' not in rule:
+            continue
+        channel, targets = rule.split('>', 1)
+        names = [target.strip().lstrip('@') for target in targets.split('|') if target.strip()]
+        if channel.strip() and names:
+            routes[_key(channel)] = names
+    return routes
+
+
+class ForwardTargets:
+    """The autobuy bots a CA is sent to, with optional per-channel routing.
+
+    fan_out() sends to every target for the channel at once, so forward
+    latency is that of the slowest target rather than the sum. A CA counts
+    as forwarded when at least one target accepted it; per-target success,
+    failure and latency are tracked either way.
+    """
+
+    def __init__(self, targets, routes=None, window=500):
+        self.targets = [target.strip().lstrip('@') for target in targets if target.strip()]
+        self.routes = routes or {}
+        self.stats = defaultdict(Counter)
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+
+    @classmethod
+    def from_env(cls, env=os.environ):
+        targets = env.get('FORWARD_TARGETS') or env.get('AUTOBUY_BOT_USERNAME', '')
+        return cls(targets.split(','), parse_routes(env.get('FORWARD_ROUTES')))
+
+    def all_targets(self):
+        names = list(self.targets)
+        for routed in self.routes.values():
+            names.extend(target for target in routed if target not in names)
+        return names
+
+    def for_channel(self, *names):
+        """Targets for the first of `names` (e.g. @username, spec) that has a route, else the defaults."""
+        for name in names:
+            if name and _key(name) in self.routes:
+                return self.routes[_key(name)]
+        return self.targets
+
+    async def fan_out(self, ca, send_one, *channel_names):
+        """Send ca to every target via `await send_one(target, ca)`; returns the targets that succeeded."""
+        targets = self.for_channel(*channel_names)
+        results = await asyncio.gather(*(self._send(target, ca, send_one) for target in targets))
+        errors = {target: error for target, error in zip(targets, results) if error is not None}
+        if len(errors) == len(targets):
+            raise FanOutError(errors)
+        return [target for target in targets if target not in errors]
+
+    async def _send(self, target, ca, send_one):
+        started = time.monotonic()
+        try:
+            await send_one(target, ca)
+        except Exception as e:
+            self.stats[target]['failed'] += 1
+            return e
+        self.latencies[target].append(time.monotonic() - started)
+        self.stats[target]['ok'] += 1
+        return None
+
+    def latency_p50(self, target):
+        samples = sorted(self.latencies.get(target, ()))
+        return samples[len(samples) // 2] if samples else None
+
+    def summary(self):
+        """One line of per-target ok / failed counts and p50 latency, for logs."""
+        parts = []
+        for target in self.all_targets():
+            p50 = self.latency_p50(target)
+            latency = f"p50 {p50 * 1000:.0f}ms" if p50 is not None else "p50 -"
+            parts.append(f"@{target} {self.stats[target]['ok']} ok / {self.stats[target]['failed']} failed, {latency}")
+        return "; ".join(parts)
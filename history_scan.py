@@ -0,0 +1,344 @@
+"""Bulk history scanner: which channels call a CA first, and by how much.
+
+Pulls the history of TARGET_CHANNELS (or --channels) concurrently, runs
+every message (text or caption, hidden links and buttons, as the monitor
+sees it) through the monitor's extractor and validator, and keeps the
+first post of each (CA, channel) in a SQLite index. Rescans are
+incremental: a channel is only fetched past its newest indexed message, plus
+any older range a larger --days asks for.
+
+    python history_scan.py --days 30          # scan, then print the report
+    python history_scan.py --report-only      # report from the index alone
+
+Uses the monitor's Telethon session by default; stop the monitor first, or
+pass --session with another logged-in session (e.g. a shard session).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from dotenv import load_dotenv
+from telethon import TelegramClient
+
+from ca_extractor import build_extractor, normalize_address
+from ca_validator import validator_from_env
+from channel_registry import ChannelRegistry
+from ingest import telethon_text
+
+HISTORY_INDEX_FILE = 'history_index.db'
+
+
+class HistoryIndex:
+    """On-disk index of the first post of each (CA, channel), plus per-channel scan state.
+
+    Sightings are upserted keeping the earliest post, so re-reading a range
+    (e.g. after an interrupted scan) changes nothing. A channel's scan state
+    is only advanced once its scan finishes.
+    """
+
+    def __init__(self, path=HISTORY_INDEX_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sightings (
+                ca         TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                chain      TEXT,
+                message_id INTEGER NOT NULL,
+                posted_at  INTEGER NOT NULL,
+                PRIMARY KEY (ca, channel_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS channels (
+                channel_id    INTEGER PRIMARY KEY,
+                name          TEXT,
+                newest_id     INTEGER,
+                oldest_id     INTEGER,
+                covered_since INTEGER,
+                messages      INTEGER NOT NULL DEFAULT 0,
+                scanned_at    REAL
+            );
+        """)
+
+    def state(self, channel_id):
+        """(newest_id, oldest_id, covered_since) for a channel, or None if never scanned.
+
+        covered_since is the unix time history is complete back to; 0 means
+        the scan reached the start of the channel.
+        """
+        return self._conn.execute(
+            'SELECT newest_id, oldest_id, covered_since FROM channels WHERE channel_id = ?', (channel_id,)
+        ).fetchone()
+
+    def add(self, rows):
+        """Insert (ca, channel_id, chain, message_id, posted_at) rows, keeping the earliest post."""
+        self._conn.execute('BEGIN')
+        self._conn.executemany("""
+            INSERT INTO sightings (ca, channel_id, chain, message_id, posted_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(ca, channel_id) DO UPDATE SET
+                message_id = excluded.message_id,
+                posted_at = excluded.posted_at
+            WHERE excluded.posted_at < sightings.posted_at
+        """, rows)
+        self._conn.execute('COMMIT')
+
+    def finish(self, channel_id, name, newest_id, oldest_id, covered_since, messages):
+        self._conn.execute("""
+            INSERT INTO channels (channel_id, name, newest_id, oldest_id, covered_since, messages, scanned_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                name = excluded.name,
+                newest_id = excluded.newest_id,
+                oldest_id = excluded.oldest_id,
+                covered_since = excluded.covered_since,
+                messages = channels.messages + excluded.messages,
+                scanned_at = excluded.scanned_at
+        """, (channel_id, name, newest_id, oldest_id, covered_since, messages, time.time()))
+
+    def channels(self):
+        """{channel_id: (name, messages scanned)}"""
+        return {
+            channel_id: (name, messages)
+            for channel_id, name, messages in self._conn.execute('SELECT channel_id, name, messages FROM channels')
+        }
+
+    def sightings(self):
+        """{ca: [(posted_at, channel_id), ...] earliest first}"""
+        by_ca = defaultdict(list)
+        for ca, channel_id, posted_at in self._conn.execute(
+            'SELECT ca, channel_id, posted_at FROM sightings ORDER BY ca, posted_at, message_id'
+        ):
+            by_ca[ca].append((posted_at, channel_id))
+        return by_ca
+
+    def close(self):
+        self._conn.close()
+
+
+class HistoryScanner:
+    """Fetch channel history concurrently and index the CAs in it.
+
+    Each channel gets a forward pass (messages newer than its newest indexed
+    ID) and, if `since` reaches further back than the index covers, a
+    backfill pass below its oldest indexed ID. Rows are written every
+    `batch` messages.
+    """
+
+    def __init__(self, client, index, extractor, validator=None, concurrency=4, batch=1000, status_callback=print):
+        self.client = client
+        self.index = index
+        self.extractor = extractor
+        self.validator = validator
+        self.concurrency = concurrency
+        self.batch = batch
+        self.status_callback = status_callback
+
+    async def scan(self, channels, since):
+        """Scan every channel back to unix time `since` (0 for all history); returns {name: report}."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def scan_one(channel):
+            async with semaphore:
+                try:
+                    return channel.name, await self.scan_channel(channel, since)
+                except Exception as e:
+                    self.status_callback(f"{channel.name}: scan failed: {e}")
+                    return channel.name, {'error': str(e)}
+
+        return dict(await asyncio.gather(*(scan_one(channel) for channel in channels)))
+
+    async def scan_channel(self, channel, since):
+        started = time.perf_counter()
+        newest_id, oldest_id, covered_since = self.index.state(channel.peer_id) or (None, None, None)
+        report = {'messages': 0, 'cas': 0}
+        rows = []
+
+        async def read(cutoff, **kwargs):
+            """Index messages newest-first until `cutoff`; returns (newest, oldest, reached_cutoff)."""
+            newest = oldest = None
+            # wait_time=0: Telethon otherwise sleeps 1s between pages on long histories; FloodWaits are still honoured
+            async for message in self.client.iter_messages(channel.peer_id, wait_time=0, **kwargs):
+                posted_at = int(message.date.timestamp()) if message.date else 0
+                if posted_at < cutoff:
+                    return newest, oldest, True
+                newest = newest or message.id
+                oldest = message.id
+                report['messages'] += 1
+                found = self.extractor.extract(telethon_text(message))
+                if found and self.validator is not None:
+                    found, _ = self.validator.filter(found)
+                for ca in found:
+                    rows.append((normalize_address(ca.address), channel.peer_id, ca.chain, message.id, posted_at))
+                if len(rows) >= self.batch:
+                    report['cas'] += len(rows)
+                    self.index.add(rows)
+                    rows.clear()
+                    await asyncio.sleep(0)
+            return newest, oldest, False
+
+        # Forward: everything newer than the index, so it stays gap-free (back to `since` on a first scan)
+        newest, oldest, reached = await read(since if newest_id is None else 0, min_id=newest_id or 0)
+        if newest_id is None:
+            oldest_id = oldest
+            covered_since = since if reached else 0
+        # Backfill: a larger window than the index covers
+        elif since < covered_since and oldest_id:
+            _, older, reached = await read(since, offset_id=oldest_id)
+            oldest_id = older or oldest_id
+            covered_since = since if reached else 0
+        if rows:
+            report['cas'] += len(rows)
+            self.index.add(rows)
+        self.index.finish(channel.peer_id, channel.name, newest or newest_id, oldest_id, covered_since,
+                          report['messages'])
+        report['seconds'] = time.perf_counter() - started
+        self.status_callback(
+            f"{channel.name}: {report['messages']} new messages, {report['cas']} CA mentions in {report['seconds']:.1f}s"
+        )
+        return report
+
+
+def build_report(index, top=10):
+    """Per-channel first-caller stats and the most overlapping channel pairs.
+
+    For each channel: calls (distinct CAs), shared (calls another channel
+    also posted), first (shared CAs it posted before everyone else),
+    hit_rate (first / shared), and the median lead (seconds ahead of the
+    next channel when first) and lag (seconds behind the first caller
+    otherwise).
+    """
+    channels = index.channels()
+    calls = Counter()
+    shared = Counter()
+    first = Counter()
+    leads = defaultdict(list)
+    lags = defaultdict(list)
+    pairs = Counter()
+    pair_leads = Counter()  # (a, b) -> CAs a posted before b
+    for sightings in index.sightings().values():
+        for _, channel_id in sightings:
+            calls[channel_id] += 1
+        if len(sightings) < 2:
+            continue
+        (first_at, first_id), (second_at, _) = sightings[0], sightings[1]
+        first[first_id] += 1
+        leads[first_id].append(second_at - first_at)
+        for posted_at, channel_id in sightings:
+            shared[channel_id] += 1
+            if channel_id != first_id:
+                lags[channel_id].append(posted_at - first_at)
+        for (_, a), (_, b) in combinations(sightings, 2):
+            pairs[tuple(sorted((a, b)))] += 1
+            pair_leads[(a, b)] += 1
+
+    def name(channel_id):
+        return channels.get(channel_id, (str(channel_id), 0))[0]
+
+    rows = []
+    for channel_id in sorted(channels, key=lambda channel_id: (-first[channel_id], -calls[channel_id])):
+        rows.append({
+            'channel': name(channel_id),
+            'messages': channels[channel_id][1],
+            'calls': calls[channel_id],
+            'shared': shared[channel_id],
+            'first': first[channel_id],
+            'hit_rate': round(first[channel_id] / shared[channel_id], 3) if shared[channel_id] else None,
+            'median_lead_s': statistics.median(leads[channel_id]) if leads[channel_id] else None,
+            'median_lag_s': statistics.median(lags[channel_id]) if lags[channel_id] else None,
+        })
+    overlap = []
+    for (a, b), count in pairs.most_common(top):
+        overlap.append({
+            'channels': [name(a), name(b)],
+            'shared': count,
+            'jaccard': round(count / (calls[a] + calls[b] - count), 3),
+            'first': {name(a): pair_leads[(a, b)], name(b): pair_leads[(b, a)]},
+        })
+    return {'channels': rows, 'overlap': overlap}
+
+
+def format_report(report):
+    def seconds(value):
+        return '-' if value is None else f"{value:.0f}s"
+
+    lines = [f"{'channel':<28} {'msgs':>7} {'calls':>6} {'shared':>6} {'first':>6} {'hit':>5} {'lead p50':>9} {'lag p50':>8}"]
+    for row in report['channels']:
+        hit = '-' if row['hit_rate'] is None else f"{row['hit_rate']:.0%}"
+        lines.append(
+            f"{row['channel'][:28]:<28} {row['messages']:>7} {row['calls']:>6} {row['shared']:>6} {row['first']:>6} "
+            f"{hit:>5} {seconds(row['median_lead_s']):>9} {seconds(row['median_lag_s']):>8}"
+        )
+    if report['overlap']:
+        lines.append("")
+        lines.append("Most overlapping pairs (shared CAs, Jaccard, who posted first):")
+        for pair in report['overlap']:
+            a, b = pair['channels']
+            lines.append(
+                f"  {a} / {b}: {pair['shared']} shared, {pair['jaccard']:.0%}, "
+                f"{a} first {pair['first'][a]}x, {b} first {pair['first'][b]}x"
+            )
+    return "\n".join(lines)
+
+
+async def run(args):
+    specs = args.channels.split(',') if args.channels else os.getenv('TARGET_CHANNELS', '').split(',')
+    registry = ChannelRegistry(specs)
+    if not registry.channels:
+        sys.exit("No channels: set TARGET_CHANNELS or pass --channels")
+    client = TelegramClient(args.session, os.getenv('API_ID'), os.getenv('API_HASH'))
+    await client.connect()
+    if not await client.is_user_authorized():
+        sys.exit(f"Session {args.session} is not logged in; run monitor_account.py (or shard_worker.py --login) first")
+    index = HistoryIndex(args.index)
+    try:
+        await registry.resolve(client)
+        for spec, error in registry.errors.items():
+            print(f"Could not resolve channel {spec}: {error}")
+        scanner = HistoryScanner(client, index, build_extractor(), validator_from_env(),
+                                 concurrency=args.concurrency)
+        since = int(time.time() - args.days * 86400) if args.days else 0
+        started = time.perf_counter()
+        results = await scanner.scan([channel for channel in registry.resolved() if channel.enabled], since)
+        total = sum(result.get('messages', 0) for result in results.values())
+        print(f"Scanned {total} new messages from {len(results)} channels in {time.perf_counter() - started:.1f}s")
+        print_report(index, args)
+    finally:
+        index.close()
+        await client.disconnect()
+
+
+def print_report(index, args):
+    report = build_report(index, top=args.top)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Index channel history and report which channels call CAs first")
+    parser.add_argument('--channels', help='comma-separated channels (default: TARGET_CHANNELS)')
+    parser.add_argument('--days', type=float, default=30, help='how far back to scan (0 for all history; default 30)')
+    parser.add_argument('--session', default='monitor_session', help='Telethon session name (default: monitor_session)')
+    parser.add_argument('--index', default=HISTORY_INDEX_FILE, help=f'index database (default: {HISTORY_INDEX_FILE})')
+    parser.add_argument('--concurrency', type=int, default=4, help='channels fetched at once (default 4)')
+    parser.add_argument('--top', type=int, default=10, help='overlapping pairs to list (default 10)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--report-only', action='store_true', help='report from the index without scanning')
+    args = parser.parse_args()
+    if args.report_only:
+        index = HistoryIndex(args.index)
+        print_report(index, args)
+        index.close()
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+import time
+from collections import OrderedDict, Counter, defaultdict, deque
+
+from ca_extractor import normalize_address
+from dispatcher import FAILED
+from latency import label_value
+
+TELETHON = 'telethon'
+BOTAPI = 'botapi'
+
+
+class Post:
+    """One channel message as delivered by an ingest source.
+
+    received_at is time.monotonic() when the source got the message, so posts
+    from different sources can be compared no matter how long they queued.
+    text is everything worth scanning (see telethon_text / bot_message_text).
+    For an edited message posted_at is the edit date, or None if the update
+    wasn't a real edit.
+    """
+
+    __slots__ = ('source', 'chat_id', 'chat', 'message_id', 'text', 'posted_at', 'received_at', 'recovered', 'edited')
+
+    def __init__(self, source, chat_id, chat, message_id, text, posted_at=None, received_at=None, recovered=False,
+                 edited=False):
+        self.source = source
+        self.chat_id = chat_id
+        self.chat = chat
+        self.message_id = message_id
+        self.text = text or ''
+        self.posted_at = posted_at
+        self.received_at = time.monotonic() if received_at is None else received_at
+        self.recovered = recovered
+        self.edited = edited
+
+
+def telethon_text(message):
+    """Text or caption of a Telethon Message, plus hidden link URLs and inline button URLs/labels.
+
+    Parts are joined by newlines; the extractor's word boundaries keep them apart.
+    """
+    text = message.message or ''
+    entities = getattr(message, 'entities', None)
+    markup = getattr(message, 'reply_markup', None)
+    if not entities and markup is None:
+        return text
+    parts = [text]
+    # MessageEntityTextUrl carries a url that isn't in the visible text
+    parts.extend(entity.url for entity in entities or () if getattr(entity, 'url', None))
+    for row in getattr(markup, 'rows', None) or ():
+        for button in row.buttons:
+            parts.extend(value for value in (button.text, getattr(button, 'url', None), getattr(button, 'query', None)) if value)
+    return '\n'.join(parts)
+
+
+def bot_message_text(message):
+    """Text or caption of a python-telegram-bot Message, plus text-link URLs and inline button URLs/labels."""
+    text = message.text or message.caption or ''
+    entities = message.entities or message.caption_entities
+    markup = message.reply_markup
+    if not entities and markup is None:
+        return text
+    parts = [text]
+    parts.extend(entity.url for entity in entities or () if entity.url)
+    for row in getattr(markup, 'inline_keyboard', None) or ():
+        for button in row:
+            parts.extend(value for value in (button.text, button.url, button.switch_inline_query) if value)
+    return '\n'.join(parts)
+
+
+def post_from_telethon(event, edited=False):
+    """Post for a Telethon NewMessage / MessageEdited event (or a catch-up RecoveredEvent)."""
+    message = event.message
+    # For edits, the edit date (None for reaction / view updates of a never-edited post)
+    posted_at = getattr(message, 'edit_date', None) if edited else message.date
+    return Post(TELETHON, event.chat_id, None, message.id, telethon_text(message), posted_at,
+                recovered=getattr(event, 'recovered', False), edited=edited)
+
+
+def post_from_bot_message(message, edited=False):
+    """Post for a python-telegram-bot channel_post (or edited_channel_post) Message."""
+    chat = message.chat
+    posted_at = message.edit_date if edited else message.date
+    return Post(BOTAPI, chat.id, chat.username or chat.title, message.message_id, bot_message_text(message), posted_at,
+                edited=edited)
+
+
+class EditTracker:
+    """Addresses already handled for each recent message, so an edit only yields what it added.
+
+    Edit updates that change nothing are dropped up front by fresh_edit():
+    Telegram also sends them for reactions and view counts, with no
+    edit_date (never edited) or the edit_date of the last real edit.
+    Messages are keyed per source (each source's copy of a post is diffed
+    on its own, so first-seen races still see both). An address only
+    counts as handled once the dispatcher has taken it (remember()); a
+    rejected address or a failed buy is tried again on the next edit. At
+    most `max_tracked` messages are remembered; an edit of a message that
+    isn't tracked counts all its addresses as new, and the dedup store
+    still stops repeats.
+    """
+
+    def __init__(self, max_tracked=5000):
+        self.max_tracked = max_tracked
+        self._seen = OrderedDict()  # (source, chat_id, message_id) -> normalized addresses
+        self._edit_dates = OrderedDict()  # (source, chat_id, message_id) -> last edit_date processed
+        self.stats = Counter()
+
+    def _track(self, table, key, value):
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_tracked:
+            table.popitem(last=False)
+
+    def fresh_edit(self, post):
+        """False for an edit update with no edit date, or the same one as last time (posted_at is the edit date)."""
+        key = (post.source, post.chat_id, post.message_id)
+        if post.posted_at is None or self._edit_dates.get(key) == post.posted_at:
+            self.stats['edits_ignored'] += 1
+            return False
+        self._track(self._edit_dates, key, post.posted_at)
+        self.stats['edits'] += 1
+        return True
+
+    def new_addresses(self, post, found):
+        """The ContractAddresses in `found` not yet handled for this message."""
+        if not found:
+            return found
+        seen = self._seen.get((post.source, post.chat_id, post.message_id), ())
+        fresh = [ca for ca in found if normalize_address(ca.address) not in seen]
+        if post.edited:
+            self.stats['edit_addresses'] += len(fresh)
+            self.stats['edit_unchanged'] += len(found) - len(fresh)
+        return fresh
+
+    def remember(self, post, addresses):
+        """Mark addresses the dispatcher has taken (forwarded, duplicate or in flight) as handled."""
+        if addresses:
+            key = (post.source, post.chat_id, post.message_id)
+            self._track(self._seen, key, self._seen.get(key, set()) | {normalize_address(address) for address in addresses})
+
+    def prometheus_lines(self):
+        return [
+            '# TYPE buybot_edits_total counter',
+            f'buybot_edits_total{{kind="applied"}} {self.stats["edits"]}',
+            f'buybot_edits_total{{kind="ignored"}} {self.stats["edits_ignored"]}',
+            '# TYPE buybot_edit_addresses_total counter',
+            f'buybot_edit_addresses_total{{kind="new"}} {self.stats["edit_addresses"]}',
+            f'buybot_edit_addresses_total{{kind="unchanged"}} {self.stats["edit_unchanged"]}',
+        ]
+
+
+class SourceRaces:
+    """Which ingest source saw each CA first, per channel.
+
+    A race is a CA that reached us through more than one source within
+    `window` seconds; the source with the earliest received_at wins it.
+    """
+
+    def __init__(self, window=30.0, max_tracked=10000):
+        self.window = window
+        self.max_tracked = max_tracked
+        self._recent = OrderedDict()  # ca -> [channel, {source: received_at}]
+        self.seen_by = Counter()  # (channel, source) -> CAs received
+        self.races = Counter()  # channel -> CAs received from more than one source
+        self.wins = Counter()  # (channel, source) -> races won
+        self.leads = defaultdict(lambda: deque(maxlen=500))  # (channel, source) -> winning margin in seconds
+
+    def seen(self, ca, source, channel, at):
+        self.seen_by[(channel, source)] += 1
+        entry = self._recent.get(ca)
+        if entry is None or at - min(entry[1].values()) > self.window:
+            self._recent[ca] = [channel, {source: at}]
+            self._recent.move_to_end(ca)
+            while len(self._recent) > self.max_tracked:
+                self._recent.popitem(last=False)
+            return
+        channel, arrivals = entry
+        if source in arrivals:
+            return
+        if len(arrivals) == 1:
+            (other, other_at), = arrivals.items()
+            winner, margin = (other, at - other_at) if other_at <= at else (source, other_at - at)
+            self.races[channel] += 1
+            self.wins[(channel, winner)] += 1
+            self.leads[(channel, winner)].append(margin)
+        arrivals[source] = at
+
+    def win_rates(self):
+        """{channel: {source: share of races won}}"""
+        rates = defaultdict(dict)
+        for (channel, source), wins in self.wins.items():
+            rates[channel][source] = wins / self.races[channel]
+        return dict(rates)
+
+    def summary(self):
+        total = sum(self.races.values())
+        if not total:
+            return "no races yet"
+        by_source = Counter()
+        for (_, source), wins in self.wins.items():
+            by_source[source] += wins
+        return ", ".join(f"{source} {wins / total:.0%}" for source, wins in by_source.most_common()) + f" of {total} races"
+
+    def prometheus_lines(self):
+        lines = ['# TYPE buybot_source_seen_total counter']
+        for (channel, source), count in sorted(self.seen_by.items()):
+            lines.append(f'buybot_source_seen_total{{channel="{label_value(channel)}",source="{source}"}} {count}')
+        lines.append('# TYPE buybot_source_races_total counter')
+        for channel, count in sorted(self.races.items()):
+            lines.append(f'buybot_source_races_total{{channel="{label_value(channel)}"}} {count}')
+        lines.append('# TYPE buybot_source_first_total counter')
+        for (channel, source), count in sorted(self.wins.items()):
+            lines.append(f'buybot_source_first_total{{channel="{label_value(channel)}",source="{source}"}} {count}')
+        return lines
+
+
+class IngestCore:
+    """Extraction, validation, race bookkeeping and dedup/dispatch shared by every source.
+
+    Each monitor turns its updates into Posts and passes them to ingest()
+    with its own send function. All sources share one dispatcher, so the
+    first source to deliver a CA forwards it and later copies come back as
+    duplicates. Edited posts only carry on with the addresses the edit
+    added (see EditTracker). Addresses the validator rejects never reach
+    the dispatcher.
+    """
+
+    def __init__(self, extractor, dispatcher, races=None, validator=None, edits=None):
+        self.extractor = extractor
+        self.dispatcher = dispatcher
+        self.races = races
+        self.validator = validator
+        self.edits = EditTracker() if edits is None else edits
+
+    async def ingest(self, post, channel, send, trace=None):
+        """Returns (accepted ContractAddresses, [(rejected ContractAddress, reason)], DispatchResults).
+
+        Edits that changed nothing return ([], [], []) without being scanned.
+        """
+        if post.edited and not self.edits.fresh_edit(post):
+            return [], [], []
+        found = self.edits.new_addresses(post, self.extractor.extract(post.text))
+        rejected = []
+        if found and self.validator is not None:
+            found, rejected = self.validator.filter(found)
+        if trace is not None:
+            trace.mark('extracted')  # includes validation
+        if not found:
+            return found, rejected, []
+        if self.races is not None and not post.recovered:
+            for ca in found:
+                self.races.seen(ca.address, post.source, channel, post.received_at)
+        results = await self.dispatcher.dispatch([ca.address for ca in found], channel, send)
+        # Failed buys are released by the dispatcher, so a later edit may retry them
+        self.edits.remember(post, [result.ca for result in results if result.status != FAILED])
+        return found, rejected, results
+
+
+class BotApiSource:
+    """Feed channel posts received by a Bot API bot into handle(post).
+
+    The bot has to be an admin of each channel to receive its posts. mode is
+    'polling' (getUpdates) or 'webhook', which listens on `port` and needs a
+    public https `webhook_url`. Bots can't message other bots, so this is an
+    ingest path only; forwarding still goes through the user account.
+    """
+
+    name = BOTAPI
+
+    def __init__(self, token, handle, mode='polling', webhook_url=None, port=8443, status_callback=None):
+        self.token = token
+        self.handle = handle
+        self.mode = mode
+        self.webhook_url = webhook_url
+        self.port = port
+        self.status_callback = status_callback
+        self.application = None
+
+    async def start(self):
+        from telegram.ext import Application, MessageHandler, filters
+        # concurrent_updates: a slow forward must not hold up the next post
+        self.application = Application.builder().token(self.token).concurrent_updates(True).build()
+        self.application.add_handler(MessageHandler(filters.UpdateType.CHANNEL_POSTS, self._on_update))
+        await self.application.initialize()
+        await self.application.start()
+        # Pending updates are dropped; missed posts are recovered through the user session
+        if self.mode == 'webhook':
+            await self.application.updater.start_webhook(
+                listen='0.0.0.0', port=self.port, url_path=self.token,
+                webhook_url=f"{self.webhook_url.rstrip('/')}/{self.token}",
+                allowed_updates=['channel_post', 'edited_channel_post'], drop_pending_updates=True,
+            )
+        else:
+            await self.application.updater.start_polling(
+                allowed_updates=['channel_post', 'edited_channel_post'], drop_pending_updates=True,
+            )
+
+    async def stop(self):
+        if self.application is None:
+            return
+        if self.application.updater.running:
+            await self.application.updater.stop()
+        if self.application.running:
+            await self.application.stop()
+        await self.application.shutdown()
+        self.application = None
+
+    async def _on_update(self, update, context):
+        try:
+            if update.edited_channel_post is not None:
+                await self.handle(post_from_bot_message(update.edited_channel_post, edited=True))
+            else:
+                await self.handle(post_from_bot_message(update.channel_post))
+        except Exception as e:
+            if self.status_callback:
+                self.status_callback(f"Bot API ingest error: {e}", "error")
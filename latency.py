@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from logging.handlers import RotatingFileHandler
+
+from event_log import queue_logger
+
+TRACE_FILE = 'latency_trace.jsonl'
+
+# Stage durations derived from the marks on a Trace:
+#   receive  - Telegram message.date -> local receipt (1s resolution)
+#   extract  - receipt -> addresses extracted
+#   dedup    - extracted -> dedup check done
+#   send     - dedup check done -> send_message acknowledged
+#   internal - receipt -> send_message acknowledged
+#   total    - message.date -> send_message acknowledged
+STAGES = ('receive', 'extract', 'dedup', 'send', 'internal', 'total')
+_STAGE_MARKS = {
+    'receive': ('posted', 'received'),
+    'extract': ('received', 'extracted'),
+    'dedup': ('extracted', 'deduped'),
+    'send': ('deduped', 'forwarded'),
+    'internal': ('received', 'forwarded'),
+    'total': ('posted', 'forwarded'),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+ALL_CHANNELS = '*'
+
+
+def label_value(value):
+    """Escape a Prometheus label value (channel titles may contain \\, " or newlines)."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Trace:
+    """Wall-clock timestamps for one message as it moves through the pipeline.
+
+    aggregate=False keeps the trace out of the all-channel histograms (e.g.
+    history recovered by catch-up, which would skew live latency).
+    """
+
+    __slots__ = ('channel', 'message_id', 'marks', 'aggregate')
+
+    def __init__(self, channel, message_id, message_date=None, aggregate=True):
+        self.channel = channel
+        self.message_id = message_id
+        self.aggregate = aggregate
+        self.marks = {'received': time.time()}
+        if message_date is not None:
+            self.marks['posted'] = message_date.timestamp()
+
+    def mark(self, stage, at=None):
+        self.marks[stage] = at if at is not None else time.time()
+
+    def fork(self):
+        """Copy the trace so each address in a message gets its own marks."""
+        trace = Trace(self.channel, self.message_id, aggregate=self.aggregate)
+        trace.marks = dict(self.marks)
+        return trace
+
+    def durations(self):
+        result = {}
+        for stage, (start, end) in _STAGE_MARKS.items():
+            if start in self.marks and end in self.marks:
+                result[stage] = self.marks[end] - self.marks[start]
+        return result
+
+
+class LatencyTracker:
+    """Rolling per-channel / per-stage latency histograms plus a JSONL trace.
+
+    Each histogram keeps the last `window` samples, so percentiles follow
+    current behaviour rather than the whole uptime.
+    """
+
+    def __init__(self, trace_file=TRACE_FILE, window=1000, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+        self.trace_logger = None
+        self._trace_listener = None
+        if trace_file:
+            self.trace_logger = logging.getLogger('latency.trace')
+            self.trace_logger.setLevel(logging.INFO)
+            self.trace_logger.propagate = False
+            if not self.trace_logger.handlers:
+                handler = RotatingFileHandler(trace_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                # File writes happen on the listener thread, never on the event loop
+                self._trace_listener = queue_logger(self.trace_logger, handler)
+        self._server = None
+        self._metric_sources = []
+        self._routes = {}
+        self.records = 0
+
+    def add_metrics_source(self, source):
+        """Register a callable returning extra Prometheus text lines."""
+        self._metric_sources.append(source)
+
+    def start_trace(self, channel, message_id, message_date=None, aggregate=True):
+        return Trace(channel, message_id, message_date, aggregate)
+
+    def record(self, trace, ca=None, outcome=None):
+        """Add a finished (or abandoned) trace to the histograms and trace file."""
+        durations = trace.durations()
+        self.records += 1
+        for stage, seconds in durations.items():
+            keys = ((trace.channel, stage), (ALL_CHANNELS, stage)) if trace.aggregate else ((trace.channel, stage),)
+            for key in keys:
+                self._samples[key].append(seconds)
+                self._counts[key] += 1
+        if self.trace_logger is not None:
+            self.trace_logger.info(json.dumps({
+                'channel': trace.channel,
+                'message_id': trace.message_id,
+                'ca': ca,
+                'outcome': outcome,
+                'marks': trace.marks,
+                'durations': durations,
+            }))
+
+    def percentiles(self, stage, channel=ALL_CHANNELS):
+        """Return {quantile: seconds} for a stage, or {} if there are no samples."""
+        samples = self._samples.get((channel, stage))
+        if not samples:
+            return {}
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(round(q * last)))] for q in QUANTILES}
+
+    def channels(self):
+        return sorted({channel for channel, _ in self._samples if channel != ALL_CHANNELS})
+
+    def prometheus_text(self):
+        lines = [
+            '# HELP buybot_stage_latency_seconds Per-stage message latency (rolling window).',
+            '# TYPE buybot_stage_latency_seconds summary',
+        ]
+        for (channel, stage), samples in sorted(self._samples.items()):
+            labels = f'stage="{stage}",channel="{label_value(channel)}"'
+            for q, value in self.percentiles(stage, channel).items():
+                lines.append(f'buybot_stage_latency_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f'buybot_stage_latency_seconds_sum{{{labels}}} {sum(samples):.6f}')
+            lines.append(f'buybot_stage_latency_seconds_count{{{labels}}} {self._counts[(channel, stage)]}')
+        for source in self._metric_sources:
+            lines.extend(source())
+        return '\n'.join(lines) + '\n'
+
+    def add_route(self, path, handler):
+        """Serve `handler() -> (status_code, content_type, body)` at path on the metrics port."""
+        self._routes[path] = handler
+
+    async def serve(self, port, host='127.0.0.1'):
+        """Serve prometheus_text() (and any extra routes) over plain HTTP on host:port."""
+        self._server = await asyncio.start_server(self._handle_http, host, port)
+        return self._server
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+            parts = request.split(b' ', 2)
+            path = parts[1].decode('latin-1').split('?', 1)[0] if len(parts) > 1 else '/'
+            if path in self._routes:
+                status, content_type, body = self._routes[path]()
+            else:
+                status, content_type, body = 200, 'text/plain; version=0.0.4', self.prometheus_text()
+            body = body.encode()
+            reason = {200: 'OK', 503: 'Service Unavailable'}.get(status, 'OK')
+            writer.write(
+                f'HTTP/1.1 {status} {reason}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                'Connection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._trace_listener is not None:
+            self._trace_listener.stop()  # drains the queue
+            for handler in self._trace_listener.handlers:
+                handler.close()
+            self._trace_listener = None
+
+
+class StartupTimer:
+    """Wall-clock breakdown of startup phases, for tracking cold-start time."""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        """Close the current phase under `phase`."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def summary(self):
+        parts = [f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases]
+        return " | ".join(parts + [f"total {self.total() * 1000:.0f}ms"])
+
+    def prometheus_lines(self):
+        lines = ['# TYPE buybot_startup_seconds gauge']
+        for phase, seconds in self.phases:
+            lines.append(f'buybot_startup_seconds{{phase="{phase}"}} {seconds:.6f}')
+        lines.append(f'buybot_startup_seconds{{phase="total"}} {self.total():.6f}')
+        return lines
@@ -1,16 +1,16 @@
+import time
+PROCESS_STARTED = time.perf_counter()  # before any other import, for the startup breakdown
+
 import sys
 import subprocess
 import os
 import asyncio
-from plyer import notification
+import argparse
+from importlib.util import find_spec
 
 def ensure_requirements():
-    try:
-        import rich
-        import colorama
-        import telethon
-        import dotenv
-    except ImportError:
+    # find_spec only locates the packages; the imports below load what's needed
+    if None in (find_spec('colorama'), find_spec('telethon'), find_spec('dotenv'), find_spec('rich')):
         print("Missing dependencies. Installing requirements.txt...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
         print("Dependencies installed. Restarting script...")
@@ -18,30 +18,30 @@ def ensure_requirements():
 
 ensure_requirements()
 
-import re
-import time
 import logging
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import datetime
 from dotenv import load_dotenv
 from telethon import TelegramClient, events
 from telethon.tl.functions.messages import SendMessageRequest
 import colorama
-from colorama import Fore, Back, Style
-from telethon.errors.rpcerrorlist import PeerIdInvalidError
-import platform
-if platform.system() == 'Windows':
-    import winsound
-    import ctypes
-# --- rich imports ---
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich.live import Live
-from rich.layout import Layout
-from rich.align import Align
-from rich.text import Text
-from rich.prompt import Prompt
-from rich import box
+from notifier import Notifier
+from ca_extractor import build_extractor
+from dedup_store import open_dedup_store
+from channel_registry import ChannelRegistry
+from latency import LatencyTracker
+from dispatcher import Dispatcher, FORWARDED, DUPLICATE, IN_FLIGHT
+from send_scheduler import scheduler_from_env
+from forward_targets import ForwardTargets
+from command_reader import CommandReader
+from latency import StartupTimer
+from catchup import LastSeenStore, recover_gaps
+from supervisor import supervisor_from_env
+from ingest import IngestCore, SourceRaces, BotApiSource, post_from_telethon, TELETHON
+from shards import ShardCoordinator
+from config_reload import ConfigReloader
+from ca_validator import validator_from_env
+from event_log import event_log_from_env
 
 # Initialize colorama
 colorama.init()
@@ -49,47 +49,19 @@ colorama.init()
 # Load environment variables
 load_dotenv()
 
-# Configure logging with colors
-class ColoredFormatter(logging.Formatter):
-    """Custom formatter with colors"""
-    grey = Fore.WHITE
-    blue = Fore.CYAN
-    yellow = Fore.YELLOW
-    red = Fore.RED
-    bold_red = Fore.RED + Style.BRIGHT
-    reset = Style.RESET_ALL
-
-    def __init__(self, fmt):
-        super().__init__()
-        self.fmt = fmt
-        self.FORMATS = {
-            logging.DEBUG: self.grey + self.fmt + self.reset,
-            logging.INFO: self.blue + self.fmt + self.reset,
-            logging.WARNING: self.yellow + self.fmt + self.reset,
-            logging.ERROR: self.red + self.fmt + self.reset,
-            logging.CRITICAL: self.bold_red + self.fmt + self.reset
-        }
-
-    def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
-
-# Set up logging
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-ch.setFormatter(ColoredFormatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(ch)
-
-def clear_screen():
-    """Clear the console screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-console = Console()
-activity_feed = []  # List of (timestamp, message, style)
+# Compiled once; handles EVM, Solana and chart/launchpad links in one pass
+extractor = build_extractor()
+# Checksum / encoding / denylist checks between extraction and dispatch (CA_DENYLIST, CA_ALLOWLIST)
+validator = validator_from_env()
+
+# Queued, non-blocking event log: JSONL file (EVENT_LOG) plus the console when headless
+event_log = event_log_from_env()
+
+tui = None  # monitor_tui, imported lazily unless --headless
 activity_feed_max = 8  # More compact
+activity_feed = deque(maxlen=activity_feed_max)  # (timestamp, message, style)
+activity_version = 0  # Bumped on every feed change so the dashboard knows to redraw
+HEADLESS = False  # Set by --headless: no TUI, activity goes to the console instead
 status_data = {
     'start_time': datetime.now(),
     'processed_count': 0,
@@ -97,52 +69,18 @@ status_data = {
     'last_channel': '-',
     'last_status': '-',
     'channels': [],
+    'last_catchup': '-',
 }
 
-# --- Stylish Header ---
-def print_header():
-    header = Text()
-    header.append("\n╔════════════════════════════════════════════╗\n", style="bold cyan")
-    header.append("║      ", style="bold cyan")
-    header.append("💎 Jacobs Crypto Tools 💎", style="bold magenta")
-    header.append("            ║\n", style="bold cyan")
-    header.append("╚════════════════════════════════════════════╝\n", style="bold cyan")
-    console.print(Align.center(header))
-    # Divider
-    console.print("[dim]─" * (min(console.width, 50)), justify="center")
-
-def print_banner():
-    """Print a fancy banner using rich"""
-    channels = get_target_channels()
-    status_data['channels'] = channels
-    banner_text = Text()
-    banner_text.append("\n Telegram Contract Monitor ", style="bold cyan on black")
-    banner_text.append("\n" + ("─" * 32) + "\n", style="cyan")
-    for channel in channels:
-        banner_text.append(f"  Monitoring: {channel}\n", style="green")
-    banner_text.append(f"  Forwarding to: @{os.getenv('AUTOBUY_BOT_USERNAME')}\n", style="yellow")
-    banner_text.append("─" * 32 + "\n", style="cyan")
-    console.print(Panel(banner_text, expand=False, border_style="cyan", title="[bold green]Welcome!"))
-
-def print_menu():
-    """Print the main menu using rich"""
-    menu = Table(show_header=False, box=box.ROUNDED, expand=False)
-    menu.add_row("[bold yellow]📋 Available Commands:")
-    menu.add_row("[green]/start[/] - Check if bot is running")
-    menu.add_row("[green]/status[/] - Show current status")
-    menu.add_row("[green]/last[/] - Show last processed contract")
-    menu.add_row("[green]/clear[/] - Clear activity feed")
-    menu.add_row("[green]/help[/] - Show this menu")
-    menu.add_row("[green]Ctrl+C[/] - Stop the bot")
-    menu.add_row("")
-    menu.add_row("[yellow]💡 Tips:")
-    menu.add_row("[cyan]- The bot will automatically forward any contract addresses it finds")
-    menu.add_row("[cyan]- You'll see real-time updates in this window")
-    menu.add_row("[cyan]- Check the activity feed below for activity")
-    console.print(menu)
-
-def print_status(message, status_type="info"):
-    """Add a status message to the activity feed with color."""
+STATUS_LEVELS = {
+    "info": logging.INFO,
+    "success": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+def print_status(message, status_type="info", **fields):
+    """Add a status message to the activity feed with color, and to the event log."""
     timestamp = datetime.now().strftime("%H:%M:%S")
     style = {
         "info": "cyan",
@@ -150,90 +88,49 @@ def print_status(message, status_type="info"):
         "error": "red",
         "warning": "yellow"
     }.get(status_type, "white")
+    global activity_version
     activity_feed.append((timestamp, message, style))
-    if len(activity_feed) > activity_feed_max:
-        activity_feed.pop(0)
-
-def get_status_panel():
-    """Return a rich Panel with live status info and icons."""
-    uptime = datetime.now() - status_data['start_time']
-    uptime_str = str(timedelta(seconds=int(uptime.total_seconds())))
-    table = Table.grid(padding=(0,1), expand=False)
-    table.add_column(justify="right", ratio=1)
-    table.add_column(justify="left", ratio=2)
-    table.add_row("[bold cyan]⏱️ Uptime:", f"[white]{uptime_str}")
-    table.add_row("[bold cyan]📡 Channels:", f"[white]{len(status_data['channels'])}")
-    table.add_row("[bold cyan]✅ Processed:", f"[white]{status_data['processed_count']}")
-    table.add_row("[bold cyan]📝 Last Contract:", f"[yellow]{status_data['last_contract']}")
-    table.add_row("[bold cyan]📢 Last Channel:", f"[green]{status_data['last_channel']}")
-    table.add_row("[bold cyan]🔔 Last Status:", f"[magenta]{status_data['last_status']}")
-    return Panel(table, title="[bold green]Live Status", border_style="bright_cyan", padding=(0,1), width=min(console.width, 80), box=box.ROUNDED)
-
-def get_activity_panel():
-    """Return a rich Panel with the activity feed and icons."""
-    feed = ""
-    for ts, msg, style in activity_feed[-activity_feed_max:]:
-        icon = ""
-        if "success" in style:
-            icon = "✅ "
-        elif "error" in style:
-            icon = "❌ "
-        elif "warning" in style:
-            icon = "⚠️ "
-        elif "info" in style:
-            icon = "ℹ️ "
-        feed += f"[{style}][{ts}] {icon}{msg}\n"
-    if not feed:
-        feed = "[dim]No activity yet."
-    return Panel(feed.rstrip(), title="[bold blue]Activity Feed", border_style="bright_magenta", padding=(0,1), width=min(console.width, 80), height=None, box=box.ROUNDED)
-
-def get_layout():
-    layout = Layout()
-    # Header
-    header = Text()
-    header.append("\n╔════════════════════════════════════════════╗\n", style="bold cyan")
-    header.append("║      ", style="bold cyan")
-    header.append("💎 Jacobs Crypto Tools 💎", style="bold magenta")
-    header.append("            ║\n", style="bold cyan")
-    header.append("╚════════════════════════════════════════════╝\n", style="bold cyan")
-    header_panel = Align.center(header)
-    # Divider
-    divider = Align.center(Text("─" * (min(console.width, 50)), style="dim"))
-    # Footer
-    footer = Align.center(Text("Tip: Type /help for commands | v1.0", style="dim"))
-    # Compose layout
-    layout.split_column(
-        Layout(header_panel, name="header", size=4),
-        Layout(divider, name="divider", size=1),
-        Layout(get_status_panel(), name="status", size=8),
-        Layout(get_activity_panel(), name="activity"),
-        Layout(footer, name="footer", size=1),
-    )
-    return layout
-
-# --- Footer ---
-def print_footer():
-    footer = Text()
-    footer.append("Tip: Type /help for commands | v1.0", style="dim")
-    console.print(Align.center(footer))
-
-def command_input_thread(live):
-    while True:
-        try:
-            # Pause live rendering for input
-            cmd = live.console.input("[bold magenta]Enter command (or /help): ")
-            command_queue.put(cmd)
-        except (KeyboardInterrupt, EOFError):
-            break
+    activity_version += 1
+    event_log.log(STATUS_LEVELS.get(status_type, logging.INFO), message, **fields)
 
 def handle_command(cmd):
     cmd = cmd.strip().lower()
     if cmd in ('/help', 'help'):
-        print_menu()
+        print_status("Commands: /start /status /last /shards /reload /loglevel [LEVEL] /clear /help | Ctrl+C to stop", "info")
     elif cmd in ('/status', 'status'):
-        console.print(get_status_panel())
+        print_status(f"Processed {status_data['processed_count']} | channels {len(status_data['channels'])} | last status {status_data['last_status']}", "info")
+        print_status(f"Validation: {validator.stats['accepted']} accepted, {validator.rejected()} rejected ({dict((reason, count) for reason, count in validator.stats.items() if reason != 'accepted')})", "info")
+        if ingest_core is not None:
+            edits = ingest_core.edits.stats
+            print_status(f"Edits: {edits['edits']} applied, {edits['edits_ignored']} ignored, {edits['edit_addresses']} new addresses, {edits['edit_unchanged']} unchanged", "info")
+        if len(INGEST_SOURCES) > 1 or shards is not None:
+            print_status(f"First seen: {source_races.summary()}", "info")
+    elif cmd in ('/shards', 'shards'):
+        if shards is None:
+            print_status("Sharding is off (set SHARD_SESSIONS)", "info")
+        for report in shards.reports() if shards is not None else []:
+            print_status(
+                f"{report['shard']}: {'up' if report['live'] else 'DOWN'}, {report['channels']} channels, "
+                f"{report['per_minute']} msg/min, ipc lag p50 {report['ipc_lag_ms']}ms, "
+                f"receive lag p50 {report['receive_lag_s']}s, {report['restarts']} restarts",
+                "info" if report['live'] else "warning",
+            )
     elif cmd in ('/last', 'last'):
-        console.print(f"[yellow]Last contract:[/] {status_data['last_contract']} from [green]{status_data['last_channel']}")
+        print_status(f"Last contract: {status_data['last_contract']} from {status_data['last_channel']}", "info")
+    elif cmd in ('/reload', 'reload'):
+        if config_reloader is None:
+            print_status("Not running yet; try again in a moment", "warning")
+        else:
+            config_reloader.request("/reload")
+    elif cmd.partition(' ')[0] in ('/loglevel', 'loglevel'):
+        level = cmd.partition(' ')[2].strip()
+        if not level:
+            print_status(f"Log level is {event_log.level}", "info")
+        else:
+            try:
+                print_status(f"Log level set to {event_log.set_level(level)}", "success")
+            except ValueError as e:
+                print_status(str(e), "warning")
     elif cmd in ('/clear', 'clear'):
         activity_feed.clear()
         print_status("Activity feed cleared.", "info")
@@ -252,12 +149,18 @@ def get_target_channels():
 def check_environment():
     """Check if all required environment variables are set."""
     print_status("Checking configuration...", "info")
-    required_vars = ['API_ID', 'API_HASH', 'AUTOBUY_BOT_USERNAME', 'TARGET_CHANNELS']
+    required_vars = ['API_ID', 'API_HASH', 'TARGET_CHANNELS']
     missing_vars = []
     
     for var in required_vars:
         if not os.getenv(var):
             missing_vars.append(var)
+    if not os.getenv('FORWARD_TARGETS') and not os.getenv('AUTOBUY_BOT_USERNAME'):
+        missing_vars.append('AUTOBUY_BOT_USERNAME (or FORWARD_TARGETS)')
+    if 'botapi' in INGEST_SOURCES and not os.getenv('MONITOR_BOT_TOKEN'):
+        missing_vars.append('MONITOR_BOT_TOKEN (needed for INGEST_SOURCES=botapi)')
+    if 'botapi' in INGEST_SOURCES and os.getenv('BOT_INGEST_MODE') == 'webhook' and not os.getenv('WEBHOOK_URL'):
+        missing_vars.append('WEBHOOK_URL (needed for BOT_INGEST_MODE=webhook)')
     
     if missing_vars:
         print_status("Missing required settings:", "error")
@@ -276,153 +179,370 @@ def check_environment():
     print_status("Configuration check passed!", "success")
     return True
 
-# Persistent storage for processed contract addresses
-PROCESSED_CONTRACTS_FILE = 'processed_contracts.txt'
-processed_contracts = set()
+# Persistent storage for processed contract addresses (opened in main)
+dedup_store = None
 
-# Notification chat ID from environment
-NOTIFY_CHAT_ID = os.getenv('NOTIFY_CHAT_ID')
+# Configured channels, resolved to peer IDs in main
+channel_registry = None
 
-def load_processed_contracts():
-    """Load processed contract addresses from file into a set."""
-    global processed_contracts
-    if os.path.exists(PROCESSED_CONTRACTS_FILE):
-        with open(PROCESSED_CONTRACTS_FILE, 'r') as f:
-            processed_contracts = set(line.strip() for line in f if line.strip())
-    else:
-        processed_contracts = set()
+# Autobuy bots each CA is fanned out to (FORWARD_TARGETS / FORWARD_ROUTES)
+forward_targets = ForwardTargets.from_env()
+target_peers = {}  # target username -> resolved input peer, filled in main
 
-def save_processed_contract(ca):
-    """Append a processed contract address to the file."""
-    with open(PROCESSED_CONTRACTS_FILE, 'a') as f:
-        f.write(ca + '\n')
+# Last message ID seen per channel, for catching up after downtime (loaded in main)
+last_seen = None
+CATCHUP_MAX_AGE = float(os.getenv('CATCHUP_MAX_AGE', os.getenv('SEND_MAX_AGE', '60')))
 
-async def send_notification(client, message):
-    """Send a notification message to the configured chat ID."""
-    if NOTIFY_CHAT_ID:
-        try:
-            await client.send_message(int(NOTIFY_CHAT_ID), message)
-        except PeerIdInvalidError:
-            print_status(f"Invalid NOTIFY_CHAT_ID: {NOTIFY_CHAT_ID}", "error")
-        except Exception as e:
-            print_status(f"Failed to send notification: {e}", "error")
-
-def local_notify(title, message, success=True):
-    """Show a popup and play a sound on Windows for local notification."""
-    if platform.system() == 'Windows':
-        # Play different sounds for success and failure
-        if success:
-            winsound.MessageBeep(winsound.MB_ICONASTERISK)  # Info sound
-        else:
-            winsound.MessageBeep(winsound.MB_ICONHAND)      # Error sound
-        # Show a popup
-        ctypes.windll.user32.MessageBoxW(0, message, title, 0x40)
+# Claims CAs before sending so concurrent posts can't double-buy (created in main)
+dispatcher = None
 
-def desktop_notify(title, message):
-    try:
-        notification.notify(
-            title=title,
-            message=message,
-            app_name="Jacobs Crypto Tools",
-            timeout=5
-        )
-    except Exception as e:
-        print(f"Desktop notification failed: {e}")
+# Extraction + dispatch shared by every ingest source (created in main). INGEST_SOURCES=telethon,botapi
+# also feeds posts the MONITOR_BOT_TOKEN bot receives into it; whichever source is first forwards the CA
+ingest_core = None
+source_races = SourceRaces()
+INGEST_SOURCES = [source.strip().lower() for source in os.getenv('INGEST_SOURCES', 'telethon').split(',') if source.strip()]
+
+# SHARD_SESSIONS=shard_a,shard_b splits TARGET_CHANNELS across extra user sessions, one worker
+# process each; their posts come back into process_post (coordinator created in main)
+SHARD_SESSIONS = [session.strip() for session in os.getenv('SHARD_SESSIONS', '').split(',') if session.strip()]
+shards = None
+
+# Watches CONFIG_FILE (default .env) and applies channel / CA_PATTERN / target changes live (created in main)
+config_reloader = None
+CONFIG_FILE = os.getenv('CONFIG_FILE', '.env')
+
+# Rate-limited, FloodWait-aware priority queue in front of send_message (created in main)
+scheduler = None
+
+# Keepalive pings, stall detection and crash restarts for the client (created in main)
+supervisor = None
+
+# Per-stage latency histograms, JSONL trace and Prometheus endpoint
+latency_tracker = LatencyTracker()
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+
+# Notification chat ID from environment
+NOTIFY_CHAT_ID = os.getenv('NOTIFY_CHAT_ID')
+
+notifier = Notifier(
+    notify_chat_id=NOTIFY_CHAT_ID,
+    status_callback=print_status,
+)
 
 async def handle_new_message(event):
-    """Handle new messages and forward contract addresses."""
+    """Telethon ingest source: handle new messages and forward contract addresses."""
+    await process_post(post_from_telethon(event))
+
+async def handle_edited_message(event):
+    """Telethon ingest source: edits can add a CA to a placeholder post; only new addresses go out."""
+    await process_post(post_from_telethon(event, edited=True))
+
+async def process_post(post):
+    """Run a post from any ingest source through the shared pipeline."""
     try:
-        chat = await event.get_chat()
-        if not hasattr(chat, 'username'):
-            return
-        channel_username = chat.username
-        if not channel_username:
+        channel = channel_registry.get(post.chat_id)
+        if channel is None:
             return
-        print_status(f"Received message from channel: @{channel_username}", "info")
-        print_status(f"Message content: {event.message.text}", "info")
-        target_channels = [channel.lstrip('@') for channel in get_target_channels()]
-        if channel_username not in target_channels:
-            print_status(f"Channel @{channel_username} not in target channels: {target_channels}", "info")
+        last_seen.update(post.chat_id, post.message_id)
+        if supervisor is not None and post.source == TELETHON and not post.recovered and not post.edited:
+            supervisor.observe(post.chat_id)
+        # Recovered history would skew the live latency histograms, per channel and overall; edits are
+        # timed from the edit, under their own label and also kept out of the overall figures
+        trace_channel = 'catch-up' if post.recovered else 'edits' if post.edited else channel.name
+        trace = latency_tracker.start_trace(trace_channel, post.message_id, post.posted_at,
+                                            aggregate=not (post.recovered or post.edited))
+        # Per-message lines only reach the event log at DEBUG; the feed shows what happened to CAs
+        event_log.debug('received', f"Received {'edited ' if post.edited else ''}message from channel: {channel.name} ({post.source})",
+                        channel=channel.name, message_id=post.message_id, source=post.source, recovered=post.recovered,
+                        edited=post.edited)
+
+        def send_one(target, ca):
+            return scheduler.submit(target, ca, priority=channel.priority, posted_at=trace.marks.get('posted'))
+
+        async def send(ca):
+            targets = forward_targets.for_channel(channel.name, channel.spec)
+            delivered = await forward_targets.fan_out(ca, send_one, channel.name, channel.spec)
+            if len(delivered) < len(targets):
+                missed = ', '.join(f"@{target}" for target in targets if target not in delivered)
+                print_status(f"{ca} was not delivered to {missed}", "warning")
+
+        found, rejected, results = await ingest_core.ingest(post, channel.name, send, trace)
+        # Fields shared by every audit record for this post
+        context = dict(channel=channel.name, message_id=post.message_id, source=post.source, recovered=post.recovered,
+                       edited=post.edited)
+        for ca, reason in rejected:
+            event_log.audit('rejected', ca=ca.address, chain=ca.chain, reason=reason, **context)
+            print_status(f"Ignored {ca.address} from {channel.name} ({reason.replace('_', ' ')})", "warning")
+        if not found:
+            if 'extracted' not in trace.marks:
+                return  # an edit update that changed nothing; not scanned, nothing to time
+            latency_tracker.record(trace, outcome='rejected' if rejected else 'no_ca')
+            event_log.debug('no_ca', "No contract addresses found in message", text=post.text, **context)
             return
-        message_text = event.message.text
-        contract_addresses = re.findall(os.getenv('CA_PATTERN', r'0x[a-fA-F0-9]{40}'), message_text)
-        if not contract_addresses:
-            print_status("No contract addresses found in message", "info")
-            return
-        print_status(f"Found contract addresses: {contract_addresses}", "success")
-        for ca in contract_addresses:
-            if ca in processed_contracts:
-                print_status(f"Contract address {ca} already processed. Skipping.", "warning")
+        print_status(f"Found contract addresses{' in an edit' if post.edited else ''}: {', '.join(f'{ca.address} ({ca.chain})' for ca in found)}", "success")
+        chains = {ca.address: ca.chain for ca in found}
+        for result in results:
+            ca = result.ca
+            ca_trace = trace.fork()
+            ca_trace.mark('deduped', result.claimed_at)
+            if result.status == FORWARDED:
+                ca_trace.mark('forwarded', result.finished_at)
+            event_log.audit(
+                result.status, ca=ca, chain=chains.get(ca), winner=result.winner,
+                error=str(result.error) if result.error else None,
+                timings_ms={stage: round(seconds * 1000, 2) for stage, seconds in ca_trace.durations().items()},
+                **context,
+            )
+            if result.status in (DUPLICATE, IN_FLIGHT):
+                latency_tracker.record(ca_trace, ca, result.status)
+                if result.status == IN_FLIGHT:
+                    print_status(f"Contract address {ca} already being forwarded from {result.winner}. Skipping.", "warning")
+                else:
+                    print_status(f"Contract address {ca} already processed. Skipping.", "warning")
                 status_data['last_status'] = 'Skipped (duplicate)'
-                continue
-            try:
-                await event.client.send_message(
-                    os.getenv('AUTOBUY_BOT_USERNAME'),
-                    ca
-                )
-                print_status(f"Forwarded contract address from @{channel_username}: {ca}", "success")
-                processed_contracts.add(ca)
-                save_processed_contract(ca)
+            elif result.status == FORWARDED:
+                latency_tracker.record(ca_trace, ca, 'forwarded')
+                print_status(f"Forwarded contract address from {channel.name}: {ca}", "success")
                 status_data['processed_count'] += 1
                 status_data['last_contract'] = ca
-                status_data['last_channel'] = channel_username
+                status_data['last_channel'] = channel.name
                 status_data['last_status'] = 'Success'
-                notify_msg = f"✅ Buy triggered for contract: {ca} from channel @{channel_username} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                await send_notification(event.client, notify_msg)
-                local_notify("Buy Triggered", f"Buy triggered for contract: {ca} from @{channel_username}", success=True)
-                desktop_notify("Buy Triggered", f"Buy triggered for contract: {ca} from @{channel_username}")
-            except Exception as e:
-                print_status(f"Error forwarding contract address from @{channel_username}: {e}", "error")
+                notifier.notify(
+                    "✅ Buy Triggered",
+                    f"{ca} from {channel.name} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                    success=True,
+                )
+            else:
+                e = result.error
+                latency_tracker.record(ca_trace, ca, 'failed')
+                print_status(f"Error forwarding contract address from {channel.name}: {e}", "error")
                 status_data['last_contract'] = ca
-                status_data['last_channel'] = channel_username
+                status_data['last_channel'] = channel.name
                 status_data['last_status'] = 'Failed'
-                notify_msg = f"❌ Failed to buy contract: {ca} from channel @{channel_username}. Error: {str(e)}"
-                await send_notification(event.client, notify_msg)
-                local_notify("Buy Failed", f"Failed to buy contract: {ca} from @{channel_username}\nError: {str(e)}", success=False)
-                desktop_notify("Buy Failed", f"Failed to buy contract: {ca} from @{channel_username}\nError: {str(e)}")
+                notifier.notify(
+                    "❌ Buy Failed",
+                    f"{ca} from {channel.name}. Error: {str(e)}",
+                    success=False,
+                )
     except Exception as e:
         print_status(f"Error processing message: {e}", "error")
 
+async def catch_up(client, reason, since):
+    """Replay posts missed while offline and report how many were recovered.
+
+    `since` is last_seen.snapshot() from before the client (re)connected.
+    """
+    report = await recover_gaps(client, channel_registry, since, handle_new_message, max_age=CATCHUP_MAX_AGE)
+    status_data['last_catchup'] = f"{report['recovered']} msgs in {report['seconds']:.1f}s ({reason})"
+    print_status(
+        f"Catch-up after {reason}: recovered {report['recovered']} messages from {report['channels']} channels "
+        f"in {report['seconds']:.2f}s ({report['too_old']} channels had older posts skipped)",
+        "success" if not report['errors'] else "warning",
+    )
+    for name, error in report['errors'].items():
+        print_status(f"Catch-up failed for {name}: {error}", "error")
+
 async def telegram_client_task(client):
-    await client.start()
-    await client.run_until_disconnected()
+    """Run the client; after a disconnect, reconnect with backoff and catch up on missed posts."""
+    while True:
+        await client.run_until_disconnected()
+        since = last_seen.snapshot()
+        print_status("Disconnected from Telegram, reconnecting...", "warning")
+        delay = 1
+        while True:
+            try:
+                await client.connect()
+                break
+            except Exception as e:
+                print_status(f"Reconnect failed: {e}. Retrying in {delay}s", "error")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+        await catch_up(client, "reconnect", since)
+
+async def resolve_targets(client, targets=None):
+    """Resolve forward targets to input peers so the first send needs no lookup."""
+    names = [name for name in (targets or forward_targets).all_targets() if name not in target_peers]
+    results = await asyncio.gather(*(client.get_input_entity(name) for name in names), return_exceptions=True)
+    for name, peer in zip(names, results):
+        if isinstance(peer, Exception):
+            print_status(f"Could not resolve forward target @{name}: {peer}", "error")
+        else:
+            target_peers[name] = peer
+
+async def apply_config(client, config):
+    """Resolve a reloaded config's channels and targets, then swap it in.
+
+    The old registry, extractor and targets keep serving updates until the
+    assignments at the end, which run without an await in between.
+    """
+    global channel_registry, extractor, validator, forward_targets
+    await asyncio.gather(config.registry.resolve(client), resolve_targets(client, config.targets))
+    for spec, error in config.registry.errors.items():
+        print_status(f"Could not resolve channel {spec}: {error}", "error")
+    # Keep per-target stats across the swap
+    config.targets.stats = forward_targets.stats
+    config.targets.latencies = forward_targets.latencies
+    config.validator.stats = validator.stats
+    channel_registry = config.registry
+    extractor = ingest_core.extractor = config.extractor
+    validator = ingest_core.validator = config.validator
+    forward_targets = config.targets
+    supervisor.registry = config.registry
+    status_data['channels'] = [channel.name for channel in channel_registry.resolved()]
+    if shards is not None:
+        shards.registry = config.registry
+        await shards.rebalance()
 
 async def main():
-    print_banner()
-    print_menu()
+    global HEADLESS, tui
+    startup = StartupTimer(PROCESS_STARTED)
+    startup.mark('imports')
+    parser = argparse.ArgumentParser(description="Telegram contract monitor")
+    parser.add_argument('--headless', action='store_true', help='no dashboard; log activity to the console instead')
+    args = parser.parse_args()
+    HEADLESS = args.headless
+    event_log.start(console=HEADLESS)  # the TUI owns the terminal otherwise
+    if not HEADLESS:
+        import monitor_tui
+        tui = monitor_tui
+        tui.attach(sys.modules[__name__])
+        tui.print_banner()
+        tui.print_menu()
+        startup.mark('tui')
     print_status("Starting up...", "info")
     if not check_environment():
+        event_log.stop()
         sys.exit(1)
     api_id = os.getenv('API_ID')
     api_hash = os.getenv('API_HASH')
-    target_channels = get_target_channels()
-    autobuy_bot = os.getenv('AUTOBUY_BOT_USERNAME')
-    status_data['channels'] = target_channels
-    load_processed_contracts()
+    global dedup_store, channel_registry, dispatcher, scheduler
+    dedup_store = open_dedup_store()
+    dispatcher = Dispatcher(dedup_store, max_concurrency=None)
+    global ingest_core
+    ingest_core = IngestCore(extractor, dispatcher, source_races, validator)
+    # Cached peer IDs let the handler filter from the very first update
+    channel_registry = ChannelRegistry.from_env().load_cached()
+    global last_seen
+    last_seen = LastSeenStore()
+    autosave_task = asyncio.create_task(last_seen.autosave())
+    startup.mark('config')
+
     client = TelegramClient('monitor_session', api_id, api_hash)
-    client.add_event_handler(handle_new_message, events.NewMessage(chats=target_channels))
+    client.add_event_handler(handle_new_message, events.NewMessage())
+    client.add_event_handler(handle_edited_message, events.MessageEdited())
+    # flood_sleep_threshold=0: Telethon would otherwise sleep through FloodWaits of up to 60s inside the
+    # call, hiding them from the scheduler's pause logic and sending past SEND_MAX_AGE.
+    # One request (one random_id) per CA and target, resent as-is on retry, so Telegram drops duplicates
+    scheduler = scheduler_from_env(
+        lambda target, request: client(request, flood_sleep_threshold=0),
+        prepare=lambda target, text: SendMessageRequest(target_peers.get(target, target), text),
+    )
+    latency_tracker.add_metrics_source(scheduler.prometheus_lines)
+    latency_tracker.add_metrics_source(startup.prometheus_lines)
+    global supervisor
+    supervisor = supervisor_from_env(client, channel_registry, last_seen, status_callback=print_status)
+    latency_tracker.add_metrics_source(supervisor.prometheus_lines)
+    latency_tracker.add_route('/health', supervisor.health_response)
+    latency_tracker.add_metrics_source(source_races.prometheus_lines)
+    latency_tracker.add_metrics_source(lambda: validator.prometheus_lines())
+    latency_tracker.add_metrics_source(ingest_core.edits.prometheus_lines)
+    latency_tracker.add_metrics_source(dedup_store.prometheus_lines)
+    scheduler.start()
+    # Live posts start moving last_seen as soon as we connect; catch-up needs the IDs from before
+    startup_seen = last_seen.snapshot()
+    await client.start()
+    startup.mark('connect')
+
+    # Resolve new channels and the autobuy bots, and warm the session, all at once
+    await asyncio.gather(channel_registry.resolve(client), resolve_targets(client), client.get_me())
+    for spec, error in channel_registry.errors.items():
+        print_status(f"Could not resolve channel {spec}: {error}", "error")
+    status_data['channels'] = [channel.name for channel in channel_registry.resolved()]
+    startup.mark('resolve')
+    notifier.client = client
+    notifier.start()
+    global shards
+    if SHARD_SESSIONS:
+        shards = ShardCoordinator(SHARD_SESSIONS, channel_registry, process_post, status_callback=print_status)
+        await shards.start()
+        latency_tracker.add_metrics_source(shards.prometheus_lines)
+        print_status(f"Sharding {len(channel_registry.channels)} channels across {len(SHARD_SESSIONS)} sessions", "info")
+    global config_reloader
+    config_reloader = ConfigReloader(lambda config: apply_config(client, config), path=CONFIG_FILE, status_callback=print_status)
+    reload_task = asyncio.create_task(config_reloader.watch())
+    bot_source = None
+    if 'botapi' in INGEST_SOURCES:
+        bot_source = BotApiSource(
+            os.getenv('MONITOR_BOT_TOKEN'), process_post,
+            mode=os.getenv('BOT_INGEST_MODE', 'polling'), webhook_url=os.getenv('WEBHOOK_URL'),
+            port=int(os.getenv('WEBHOOK_PORT', '8443')), status_callback=print_status,
+        )
+        try:
+            await bot_source.start()
+            print_status(f"Bot API ingest running ({bot_source.mode}) alongside the user session", "info")
+        except Exception as e:
+            print_status(f"Could not start Bot API ingest: {e}", "error")
+            bot_source = None
+    if METRICS_PORT:
+        try:
+            await latency_tracker.serve(METRICS_PORT)
+            print_status(f"Metrics on http://127.0.0.1:{METRICS_PORT}/metrics", "info")
+        except OSError as e:
+            print_status(f"Could not start metrics endpoint: {e}", "warning")
     print_status("Client is now running!", "success")
-    print_status(f"Monitoring channels: {', '.join(target_channels)}", "info")
-    print_status(f"Forwarding to: @{autobuy_bot}", "info")
+    print_status(f"Monitoring channels: {', '.join(status_data['channels'])}", "info")
+    print_status(f"Forwarding to: {', '.join('@' + target for target in forward_targets.all_targets())}", "info")
     print_status("Waiting for contract addresses...", "info")
-    tg_task = asyncio.create_task(telegram_client_task(client))
+    tg_task = asyncio.create_task(supervisor.run_client(lambda: telegram_client_task(client)))
+    watchdog_task = asyncio.create_task(supervisor.watchdog())
+    startup.mark('ready')
+    print_status(f"Startup: {startup.summary()}", "info")
+    catchup_task = asyncio.create_task(catch_up(client, "startup", startup_seen))
+    dashboard = None if HEADLESS else tui.build_dashboard()
+    commands = CommandReader()
     try:
+        if dashboard is not None:
+            dashboard.start()
+        commands.start()
         while True:
-            # Show dashboard
-            with Live(get_layout(), refresh_per_second=2, screen=True, console=console):
-                await asyncio.sleep(0.1)  # Let the dashboard render briefly
-            # Prompt for input outside Live context
-            cmd = await asyncio.to_thread(console.input, "[bold magenta]Enter command (or /help): ")
+            get_cmd = asyncio.ensure_future(commands.get())
+            done, _ = await asyncio.wait({get_cmd, tg_task}, return_when=asyncio.FIRST_COMPLETED)
+            if tg_task in done:
+                get_cmd.cancel()
+                tg_task.result()
+                print_status("Telegram client stopped.", "warning")
+                break
+            cmd = get_cmd.result()
+            if cmd is None:
+                # stdin closed (e.g. running under a service manager); keep monitoring
+                await tg_task
+                break
             handle_command(cmd)
     except KeyboardInterrupt:
-        console.print("\n[bold yellow]👋 Client stopped by user. Goodbye!")
+        print("\n👋 Client stopped by user. Goodbye!")
     except Exception as e:
         print_status(f"Unexpected error: {e}", "error")
-        console.print(f"\n[red]❌ Client encountered an error and needs to stop.")
-        console.print(f"[red]Please check the error message above and try again.")
+        print("\n❌ Client encountered an error and needs to stop.")
+        print(f"Error: {e}")
         sys.exit(1)
     finally:
+        if dashboard is not None:
+            await dashboard.stop()
         tg_task.cancel()
+        watchdog_task.cancel()
+        reload_task.cancel()
+        catchup_task.cancel()
+        autosave_task.cancel()
+        await asyncio.gather(autosave_task, return_exceptions=True)
+        if bot_source is not None:
+            await bot_source.stop()
+        if shards is not None:
+            await shards.stop()
+        await scheduler.stop()
+        await notifier.stop()
+        await latency_tracker.close()
+        dedup_store.close()
+        event_log.stop()
 
 if __name__ == '__main__':
     asyncio.run(main()) 
\ No newline at end of file
@@ -1,10 +1,16 @@
 import os
-import re
 import logging
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
+from ca_extractor import build_extractor
+from dedup_store import open_dedup_store
+from dispatcher import Dispatcher, dispatch_concurrency, FORWARDED, FAILED
+from forward_targets import ForwardTargets
+from ingest import IngestCore, post_from_bot_message
+from ca_validator import validator_from_env
+
 # Load environment variables
 load_dotenv()
 
@@ -17,66 +23,69 @@ logger = logging.getLogger(__name__)
 
 # Get configuration from environment variables
 MONITOR_BOT_TOKEN = os.getenv('MONITOR_BOT_TOKEN')
-AUTOBUY_BOT_USERNAME = os.getenv('AUTOBUY_BOT_USERNAME')
+forward_targets = ForwardTargets.from_env()
 TARGET_CHANNEL = os.getenv('TARGET_CHANNEL')
-CA_PATTERN = os.getenv('CA_PATTERN', r'0x[a-fA-F0-9]{40}')
-PROCESSED_CONTRACTS_FILE = 'processed_contracts.txt'
-processed_contracts = set()
-
-def load_processed_contracts():
-    global processed_contracts
-    if os.path.exists(PROCESSED_CONTRACTS_FILE):
-        with open(PROCESSED_CONTRACTS_FILE, 'r') as f:
-            processed_contracts = set(line.strip() for line in f if line.strip())
-    else:
-        processed_contracts = set()
-
-def save_processed_contract(ca):
-    with open(PROCESSED_CONTRACTS_FILE, 'a') as f:
-        f.write(ca + '\n')
+extractor = build_extractor()
+dedup_store = None
+ingest_core = None
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send a message when the command /start is issued."""
     await update.message.reply_text('Bot is running and monitoring for contract addresses!')
 
 async def forward_contract_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Process messages and forward contract addresses to the autobuy bot, skipping duplicates."""
-    if not update.channel_post:
+    """Process channel posts (new or edited) and forward contract addresses to the autobuy bot, skipping duplicates."""
+    message = update.channel_post or update.edited_channel_post
+    if not message:
         return
 
     # Check if the message is from the target channel
-    if update.channel_post.chat.username != TARGET_CHANNEL.lstrip('@'):
+    if message.chat.username != TARGET_CHANNEL.lstrip('@'):
         return
 
-    # Extract contract addresses from the message
-    message_text = update.channel_post.text
-    contract_addresses = re.findall(CA_PATTERN, message_text)
+    async def send_one(target, ca):
+        await context.bot.send_message(
+            chat_id=f"@{target}",
+            text=ca
+        )
 
-    if not contract_addresses:
-        return
+    async def send(ca):
+        targets = forward_targets.for_channel(TARGET_CHANNEL)
+        delivered = await forward_targets.fan_out(ca, send_one, TARGET_CHANNEL)
+        if len(delivered) < len(targets):
+            missed = ', '.join(f"@{target}" for target in targets if target not in delivered)
+            logger.warning(f"{ca} was not delivered to {missed}")
 
-    for ca in contract_addresses:
-        if ca in processed_contracts:
-            logger.info(f"Contract address {ca} already processed. Skipping.")
-            continue
-        try:
-            await context.bot.send_message(
-                chat_id=f"@{AUTOBUY_BOT_USERNAME}",
-                text=ca
-            )
-            logger.info(f"Forwarded contract address: {ca}")
-            processed_contracts.add(ca)
-            save_processed_contract(ca)
-        except Exception as e:
-            logger.error(f"Error forwarding contract address: {e}")
+    # Captions, text-link URLs and inline buttons are scanned too; an edit only dispatches addresses it added
+    post = post_from_bot_message(message, edited=update.edited_channel_post is not None)
+    _, rejected, results = await ingest_core.ingest(post, TARGET_CHANNEL, send)
+    for ca, reason in rejected:
+        logger.info(f"Rejected {ca.address} ({reason})")
+    for result in results:
+        if result.status == FORWARDED:
+            delay = f" {result.finished_at - post.posted_at.timestamp():.1f}s after the {'edit' if post.edited else 'post'}" if post.posted_at else ""
+            logger.info(f"Forwarded contract address: {result.ca}{delay}")
+        elif result.status == FAILED:
+            logger.error(f"Error forwarding contract address: {result.error}")
+        else:
+            logger.info(f"Contract address {result.ca} already processed. Skipping.")
+    if any(result.status in (FORWARDED, FAILED) for result in results):
+        logger.info(f"Targets: {forward_targets.summary()}")
 
 def main():
     """Start the bot."""
-    load_processed_contracts()
+    global dedup_store, ingest_core
+    dedup_store = open_dedup_store()
+    ingest_core = IngestCore(
+        extractor, Dispatcher(dedup_store, max_concurrency=dispatch_concurrency()), validator=validator_from_env(),
+    )
     application = Application.builder().token(MONITOR_BOT_TOKEN).build()
     application.add_handler(CommandHandler("start", start))
     application.add_handler(MessageHandler(filters.ChatType.CHANNEL, forward_contract_address))
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    try:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
+    finally:
+        dedup_store.close()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
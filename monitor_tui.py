@@ -0,0 +1,188 @@
+"""Rich dashboard and console output for monitor_account.
+
+Imported only when the dashboard is used, so ``--headless`` starts
+without loading rich. Call attach() with the monitor module first; the
+panels read its state (status_data, activity_feed, dispatcher, ...).
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+from rich.align import Align
+from rich.text import Text
+from rich import box
+
+from dashboard import Dashboard
+from dispatcher import IN_FLIGHT
+
+console = Console()
+app = None  # the running monitor module, set by attach()
+
+def attach(module):
+    """Point the panels at the monitor module whose state they display."""
+    global app
+    app = module
+
+def clear_screen():
+    """Clear the console screen."""
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+# --- Stylish Header ---
+def print_header():
+    header = Text()
+    header.append("\n╔════════════════════════════════════════════╗\n", style="bold cyan")
+    header.append("║      ", style="bold cyan")
+    header.append("💎 Jacobs Crypto Tools 💎", style="bold magenta")
+    header.append("            ║\n", style="bold cyan")
+    header.append("╚════════════════════════════════════════════╝\n", style="bold cyan")
+    console.print(Align.center(header))
+    # Divider
+    console.print("[dim]─" * (min(console.width, 50)), justify="center")
+
+def print_banner():
+    """Print a fancy banner using rich"""
+    channels = app.get_target_channels()
+    app.status_data['channels'] = channels
+    banner_text = Text()
+    banner_text.append("\n Telegram Contract Monitor ", style="bold cyan on black")
+    banner_text.append("\n" + ("─" * 32) + "\n", style="cyan")
+    for channel in channels:
+        banner_text.append(f"  Monitoring: {channel}\n", style="green")
+    for target in app.forward_targets.all_targets():
+        banner_text.append(f"  Forwarding to: @{target}\n", style="yellow")
+    banner_text.append("─" * 32 + "\n", style="cyan")
+    console.print(Panel(banner_text, expand=False, border_style="cyan", title="[bold green]Welcome!"))
+
+def print_menu():
+    """Print the main menu using rich"""
+    menu = Table(show_header=False, box=box.ROUNDED, expand=False)
+    menu.add_row("[bold yellow]📋 Available Commands:")
+    menu.add_row("[green]/start[/] - Check if bot is running")
+    menu.add_row("[green]/status[/] - Show current status")
+    menu.add_row("[green]/last[/] - Show last processed contract")
+    menu.add_row("[green]/clear[/] - Clear activity feed")
+    menu.add_row("[green]/help[/] - Show this menu")
+    menu.add_row("[green]Ctrl+C[/] - Stop the bot")
+    menu.add_row("")
+    menu.add_row("[yellow]💡 Tips:")
+    menu.add_row("[cyan]- The bot will automatically forward any contract addresses it finds")
+    menu.add_row("[cyan]- You'll see real-time updates in this window")
+    menu.add_row("[cyan]- Check the activity feed below for activity")
+    console.print(menu)
+
+def get_status_panel():
+    """Return a rich Panel with live status info and icons."""
+    uptime = datetime.now() - app.status_data['start_time']
+    uptime_str = str(timedelta(seconds=int(uptime.total_seconds())))
+    table = Table.grid(padding=(0,1), expand=False)
+    table.add_column(justify="right", ratio=1)
+    table.add_column(justify="left", ratio=2)
+    table.add_row("[bold cyan]⏱️ Uptime:", f"[white]{uptime_str}")
+    table.add_row("[bold cyan]📡 Channels:", f"[white]{len(app.status_data['channels'])}")
+    table.add_row("[bold cyan]✅ Processed:", f"[white]{app.status_data['processed_count']}")
+    table.add_row("[bold cyan]📝 Last Contract:", f"[yellow]{app.status_data['last_contract']}")
+    table.add_row("[bold cyan]📢 Last Channel:", f"[green]{app.status_data['last_channel']}")
+    table.add_row("[bold cyan]🔔 Last Status:", f"[magenta]{app.status_data['last_status']}")
+    table.add_row("[bold cyan]🛡️ Filtered:", f"[white]{app.validator.rejected()} rejected ({', '.join(f'{count} {reason}' for reason, count in app.validator.stats.items() if reason != 'accepted') or 'none'})")
+    table.add_row("[bold cyan]🔁 Catch-up:", f"[white]{app.status_data['last_catchup']}")
+    if app.supervisor is not None:
+        health = app.supervisor.health()
+        rtt = f"{health['rtt_ms']:.0f}ms" if health['rtt_ms'] is not None else "-"
+        color = {'ok': 'green', 'degraded': 'yellow'}.get(health['status'], 'red')
+        table.add_row("[bold cyan]🩺 Connection:", f"[{color}]{health['status']}[white], ping {rtt}, {health['reconnects']} reconnects, {health['restarts']} restarts")
+    if app.dispatcher is not None:
+        table.add_row("[bold cyan]🏁 Races:", f"[white]{app.dispatcher.stats[IN_FLIGHT]} blocked, {app.dispatcher.in_flight()} in flight")
+    if app.scheduler is not None:
+        waits = app.scheduler.wait_percentiles()
+        wait_str = f"p95 wait {waits[1] * 1000:.0f}ms" if waits else "no waits yet"
+        table.add_row("[bold cyan]📤 Send Queue:", f"[white]{app.scheduler.depth()} queued, {wait_str}, {app.scheduler.stats['flood_waits']} flood waits, {app.scheduler.stats['stale']} stale")
+    if len(app.INGEST_SOURCES) > 1 or app.shards is not None:
+        table.add_row("[bold cyan]🏎️ First Seen:", f"[white]{app.source_races.summary()}")
+    if app.shards is not None:
+        table.add_row("[bold cyan]🧩 Shards:", f"[white]{app.shards.summary()}")
+    table.add_row("[bold cyan]📣 Notifications:", f"[white]{app.notifier.stats['delivered']} sent, {app.notifier.stats['dropped']} dropped, {app.notifier.stats['late']} late")
+    return Panel(table, title="[bold green]Live Status", border_style="bright_cyan", padding=(0,1), width=min(console.width, 80), box=box.ROUNDED)
+
+def get_activity_panel():
+    """Return a rich Panel with the activity feed and icons."""
+    feed = ""
+    for ts, msg, style in app.activity_feed:
+        icon = ""
+        if "success" in style:
+            icon = "✅ "
+        elif "error" in style:
+            icon = "❌ "
+        elif "warning" in style:
+            icon = "⚠️ "
+        elif "info" in style:
+            icon = "ℹ️ "
+        feed += f"[{style}][{ts}] {icon}{msg}\n"
+    if not feed:
+        feed = "[dim]No activity yet."
+    return Panel(feed.rstrip(), title="[bold blue]Activity Feed", border_style="bright_magenta", padding=(0,1), width=min(console.width, 80), height=None, box=box.ROUNDED)
+
+def get_latency_panel():
+    """Return a rich Panel with rolling p50/p95/p99 latency per stage."""
+    table = Table(box=None, padding=(0,1), expand=False)
+    table.add_column("Stage", style="bold cyan")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    for stage in ('receive', 'extract', 'dedup', 'send', 'total'):
+        values = app.latency_tracker.percentiles(stage)
+        cells = [f"{values[q] * 1000:.1f}ms" if values else "-" for q in (0.5, 0.95, 0.99)]
+        table.add_row(stage, *cells)
+    return Panel(table, title="[bold yellow]Latency", border_style="bright_yellow", padding=(0,1), width=min(console.width, 80), box=box.ROUNDED)
+
+def get_targets_panel():
+    """Return a rich Panel with per-target forward results and latency."""
+    table = Table(box=None, padding=(0,1), expand=False)
+    table.add_column("Target", style="bold cyan")
+    table.add_column("OK", justify="right", style="green")
+    table.add_column("Failed", justify="right", style="red")
+    table.add_column("p50", justify="right")
+    for target in app.forward_targets.all_targets():
+        stats = app.forward_targets.stats[target]
+        p50 = app.forward_targets.latency_p50(target)
+        table.add_row(f"@{target}", str(stats['ok']), str(stats['failed']), f"{p50 * 1000:.0f}ms" if p50 is not None else "-")
+    return Panel(table, title="[bold green]Targets", border_style="green", padding=(0,1), width=min(console.width, 80), box=box.ROUNDED)
+
+def get_header():
+    header = Text()
+    header.append("\n╔════════════════════════════════════════════╗\n", style="bold cyan")
+    header.append("║      ", style="bold cyan")
+    header.append("💎 Jacobs Crypto Tools 💎", style="bold magenta")
+    header.append("            ║\n", style="bold cyan")
+    header.append("╚════════════════════════════════════════════╝\n", style="bold cyan")
+    return Align.center(header)
+
+def status_version():
+    """Changes once a second (uptime) or when a forward result lands."""
+    return (int(time.monotonic()), app.status_data['processed_count'], app.status_data['last_contract'], app.status_data['last_status'], app.status_data['last_catchup'],
+            sum(app.source_races.wins.values()), app.validator.rejected(),
+            app.shards.summary() if app.shards is not None else None,
+            (app.supervisor.ping_failures, app.supervisor.rtt, app.supervisor.reconnects, app.supervisor.restarts) if app.supervisor is not None else None)
+
+def targets_version():
+    return (tuple(app.forward_targets.all_targets()), sum(sum(counts.values()) for counts in app.forward_targets.stats.values()))
+
+def build_dashboard():
+    """Create the long-lived dashboard; each panel redraws only when its version changes."""
+    dashboard = Dashboard(console, interval=0.5)
+    dashboard.add_panel("header", get_header, size=4)
+    dashboard.add_panel("divider", lambda: Align.center(Text("─" * (min(console.width, 50)), style="dim")), size=1)
+    dashboard.add_panel("status", get_status_panel, status_version, size=16)
+    dashboard.add_panel("latency", get_latency_panel, lambda: app.latency_tracker.records, size=8)
+    dashboard.add_panel("targets", get_targets_panel, targets_version, size=lambda: len(app.forward_targets.all_targets()) + 3)
+    dashboard.add_panel("activity", get_activity_panel, lambda: app.activity_version)
+    dashboard.add_panel("footer", lambda: Align.center(Text("Tip: Type /help + Enter for commands | v1.0", style="dim")), size=1)
+    return dashboard
+
+# --- Footer ---
+def print_footer():
+    footer = Text()
+    footer.append("Tip: Type /help for commands | v1.0", style="dim")
+    console.print(Align.center(footer))
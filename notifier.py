@@ -0,0 +1,164 @@
+import asyncio
+import platform
+import time
+
+from telethon.errors.rpcerrorlist import PeerIdInvalidError
+
+APP_NAME = "Jacobs Crypto Tools"
+
+
+class Notifier:
+    """Queue buy notifications and deliver them from a background worker.
+
+    Forwarding code only ever calls notify(), which never awaits. The worker
+    coalesces bursts into a single Telegram message / popup and runs the
+    blocking OS-level popups and sounds in worker threads, so a modal
+    MessageBox can no longer stall the event loop.
+    """
+
+    def __init__(self, client=None, notify_chat_id=None, status_callback=None,
+                 coalesce_window=0.5, max_queue=200, max_delay=10.0):
+        self.client = client
+        self.notify_chat_id = int(notify_chat_id) if notify_chat_id else None
+        self.status_callback = status_callback
+        self.coalesce_window = coalesce_window
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.stats = {
+            'queued': 0,
+            'delivered': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'late': 0,
+            'popups_skipped': 0,
+            'desktop_failed': 0,
+        }
+        self._worker_task = None
+        self._popup_task = None
+        self._local_tasks = set()  # popup and sound tasks, referenced so they aren't collected mid-run
+
+    def start(self):
+        """Start the background delivery worker."""
+        if self._worker_task is None:
+            self._worker_task = asyncio.create_task(self._worker())
+
+    async def stop(self):
+        """Stop the worker; anything still queued is counted as dropped."""
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+        self.stats['dropped'] += self.queue.qsize()
+
+    def notify(self, title, message, success=True):
+        """Enqueue a notification without blocking the caller."""
+        try:
+            self.queue.put_nowait((time.monotonic(), title, message, success))
+            self.stats['queued'] += 1
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Coalesce anything that arrives shortly after the first item
+            deadline = time.monotonic() + self.coalesce_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                self._report(f"Notification delivery failed: {e}", "error")
+
+    async def _deliver(self, batch):
+        now = time.monotonic()
+        for queued_at, _, _, _ in batch:
+            if now - queued_at > self.max_delay:
+                self.stats['late'] += 1
+        self.stats['delivered'] += len(batch)
+        self.stats['coalesced'] += len(batch) - 1
+
+        success = all(item[3] for item in batch)
+        if len(batch) == 1:
+            _, title, message, _ = batch[0]
+        else:
+            title = f"{len(batch)} buy events"
+            message = "\n".join(f"{item[1]}: {item[2]}" for item in batch)
+
+        self._show_local(title, message, success)
+        error = await asyncio.to_thread(desktop_notify, title, message)
+        if error is not None:
+            self.stats['desktop_failed'] += 1
+            if self.stats['desktop_failed'] == 1:  # without a plyer backend every toast fails; say so once
+                self._report(f"Desktop notification failed: {error}", "warning")
+        await self._send_telegram(message)
+
+    async def _send_telegram(self, message):
+        if not self.notify_chat_id or self.client is None:
+            return
+        try:
+            await self.client.send_message(self.notify_chat_id, message)
+        except PeerIdInvalidError:
+            self._report(f"Invalid NOTIFY_CHAT_ID: {self.notify_chat_id}", "error")
+        except Exception as e:
+            self._report(f"Failed to send notification: {e}", "error")
+
+    def _show_local(self, title, message, success):
+        # Only one modal popup at a time; later events still get the sound
+        if self._popup_task is not None and not self._popup_task.done():
+            self.stats['popups_skipped'] += 1
+            self._spawn(asyncio.to_thread(play_sound, success))
+            return
+        self._popup_task = self._spawn(asyncio.to_thread(local_notify, title, message, success))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._local_tasks.add(task)
+        task.add_done_callback(self._local_tasks.discard)
+        return task
+
+    def _report(self, message, status_type):
+        if self.status_callback:
+            self.status_callback(message, status_type)
+
+
+def play_sound(success=True):
+    """Play the Windows info / error beep."""
+    if platform.system() == 'Windows':
+        import winsound
+        if success:
+            winsound.MessageBeep(winsound.MB_ICONASTERISK)  # Info sound
+        else:
+            winsound.MessageBeep(winsound.MB_ICONHAND)      # Error sound
+
+
+def local_notify(title, message, success=True):
+    """Show a popup and play a sound on Windows for local notification (blocking)."""
+    if platform.system() == 'Windows':
+        import ctypes
+        play_sound(success)
+        ctypes.windll.user32.MessageBoxW(0, message, title, 0x40)
+
+
+def desktop_notify(title, message):
+    """Show a desktop toast via plyer (blocking); returns the exception if it failed."""
+    try:
+        from plyer import notification
+        notification.notify(
+            title=title,
+            message=message,
+            app_name=APP_NAME,
+            timeout=5
+        )
+    except Exception as e:
+        return e
+    return None
@@ -0,0 +1,209 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import Counter, deque
+
+from telethon.errors import BadRequestError, FloodWaitError, ForbiddenError, RandomIdDuplicateError
+
+# Sending again can't fix these: bad or unresolvable peer (ValueError from
+# get_input_entity), a blocked bot, no right to write
+PERMANENT_ERRORS = (BadRequestError, ForbiddenError, ValueError)
+
+
+class StaleSendError(Exception):
+    """The CA waited longer than SEND_MAX_AGE and was dropped instead of sent."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` banked."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Job:
+    __slots__ = ('target', 'payload', 'posted_at', 'queued_at', 'attempts', 'future')
+
+    def __init__(self, target, payload, posted_at):
+        self.target = target
+        self.payload = payload
+        self.posted_at = posted_at
+        self.queued_at = time.time()
+        self.attempts = 0
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class SendScheduler:
+    """Priority-ordered, rate-limited outbound sender.
+
+    Jobs are ordered by channel priority (higher first) and then by message
+    age (older first). Workers take a token from the bucket before each
+    send. A FloodWaitError pauses every worker for the requested time and
+    puts the job back on the queue. Other errors are retried with capped
+    exponential backoff, except PERMANENT_ERRORS, which fail at once. A job
+    older than max_age when a worker picks it up fails with StaleSendError
+    instead of being sent late.
+
+    send(target, payload) is awaited for each attempt. The payload is
+    prepare(target, text), built once at submit, so every retry resends the
+    same request. A request that carries a random_id lets Telegram drop a
+    retry of a send that already arrived (RandomIdDuplicateError, counted as
+    sent) instead of delivering the CA twice. Without prepare the payload is
+    the text.
+    """
+
+    def __init__(self, send, rate=2.0, burst=10, workers=4, max_age=60.0,
+                 max_retries=3, backoff=0.5, max_backoff=5.0, window=1000, prepare=None):
+        self.send = send
+        self.prepare = prepare
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = workers
+        self.max_age = max_age
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.queue = asyncio.PriorityQueue()
+        self.wait_times = deque(maxlen=window)
+        self.stats = Counter()
+        self.paused_until = 0.0
+        self._seq = itertools.count()
+        self._tasks = []
+        self._retries = set()  # pending _retry_later tasks, referenced so they aren't collected
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        while not self.queue.empty():
+            job = self.queue.get_nowait()[-1]
+            if not job.future.done():
+                job.future.cancel()
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def submit(self, target, text, priority=0, posted_at=None):
+        """Queue text for target and return a future resolved with the send result."""
+        job = _Job(target, self.prepare(target, text) if self.prepare else text, posted_at or time.time())
+        self._put(job, priority)
+        self.stats['submitted'] += 1
+        return job.future
+
+    def _put(self, job, priority):
+        self.queue.put_nowait((-priority, job.posted_at, next(self._seq), job))
+
+    async def _worker(self):
+        while True:
+            neg_priority, _, _, job = await self.queue.get()
+            try:
+                await self._process(job, -neg_priority)
+            except Exception as e:
+                # A bad job must not take the worker (and every later submit) down with it
+                self.stats['errors'] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+
+    async def _process(self, job, priority):
+        if job.future.done():
+            return  # caller gave up (timed out or cancelled)
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        age = time.time() - job.posted_at
+        if self.max_age and age > self.max_age:
+            self.stats['stale'] += 1
+            if not job.future.done():
+                job.future.set_exception(StaleSendError(f"dropped after {age:.1f}s (max {self.max_age:.0f}s)"))
+            return
+        await self.bucket.acquire()
+        if job.future.done():
+            return
+        if job.attempts == 0:
+            self.wait_times.append(time.time() - job.queued_at)
+        job.attempts += 1
+        try:
+            result = await self.send(job.target, job.payload)
+        except FloodWaitError as e:
+            self.stats['flood_waits'] += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + e.seconds)
+            self._put(job, priority)
+            return
+        except RandomIdDuplicateError:
+            # An earlier attempt of this very request got through before its error
+            result = None
+        except Exception as e:
+            if isinstance(e, PERMANENT_ERRORS) or job.attempts > self.max_retries:
+                self.stats['failed'] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+            self.stats['retries'] += 1
+            task = asyncio.create_task(self._retry_later(job, priority))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+        self.stats['sent'] += 1
+        if not job.future.done():
+            job.future.set_result(result)
+
+    async def _retry_later(self, job, priority):
+        await asyncio.sleep(min(self.max_backoff, self.backoff * 2 ** (job.attempts - 1)))
+        self._put(job, priority)
+
+    def wait_percentiles(self):
+        """Return (p50, p95, p99) queue wait in seconds, or None without samples."""
+        if not self.wait_times:
+            return None
+        ordered = sorted(self.wait_times)
+        last = len(ordered) - 1
+        return tuple(ordered[int(round(q * last))] for q in (0.5, 0.95, 0.99))
+
+    def prometheus_lines(self):
+        lines = [
+            '# TYPE buybot_send_queue_depth gauge',
+            f'buybot_send_queue_depth {self.depth()}',
+            '# TYPE buybot_send_total counter',
+        ]
+        for outcome in ('submitted', 'sent', 'retries', 'flood_waits', 'stale', 'failed', 'errors'):
+            lines.append(f'buybot_send_total{{outcome="{outcome}"}} {self.stats[outcome]}')
+        waits = self.wait_percentiles()
+        if waits:
+            lines.append('# TYPE buybot_send_queue_wait_seconds summary')
+            for q, value in zip((0.5, 0.95, 0.99), waits):
+                lines.append(f'buybot_send_queue_wait_seconds{{quantile="{q}"}} {value:.6f}')
+        return lines
+
+
+def scheduler_from_env(send, prepare=None):
+    """Build a SendScheduler from SEND_RATE, SEND_BURST, SEND_MAX_AGE and SEND_MAX_RETRIES."""
+    return SendScheduler(
+        send,
+        prepare=prepare,
+        rate=float(os.getenv('SEND_RATE', '2')),
+        burst=int(os.getenv('SEND_BURST', '10')),
+        workers=int(os.getenv('DISPATCH_CONCURRENCY', '4')),
+        max_age=float(os.getenv('SEND_MAX_AGE', '60')),
+        max_retries=int(os.getenv('SEND_MAX_RETRIES', '3')),
+    )
@@ -0,0 +1,114 @@
+"""Shard worker: one Telethon user session watching the channels it is assigned.
+
+monitor_account.py starts one of these per SHARD_SESSIONS entry and talks to
+it over a localhost TCP connection (JSON lines). The worker only receives
+posts and streams them back; dedup and forwarding stay in the coordinator.
+
+Log a session in once before using it as a shard:
+
+    python shard_worker.py --login shard_a
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from telethon import TelegramClient, events
+
+from channel_registry import ChannelRegistry
+from ingest import telethon_text
+
+HEARTBEAT_INTERVAL = 5
+
+
+async def run(session, port, token):
+    client = TelegramClient(session, os.getenv('API_ID'), os.getenv('API_HASH'))
+    await client.connect()
+    if not await client.is_user_authorized():
+        sys.exit(f"Session {session} is not logged in; run: python shard_worker.py --login {session}")
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    def send(message):
+        writer.write((json.dumps(message) + '\n').encode())
+
+    registry = ChannelRegistry([], cache_file=f'channel_cache_{session}.json')
+
+    async def on_message(event, edited=False):
+        if registry.get(event.chat_id) is None:
+            return
+        message = event.message
+        date = message.edit_date if edited else message.date
+        send({
+            'type': 'post', 'chat_id': event.chat_id, 'message_id': message.id, 'text': telethon_text(message),
+            'date': date.timestamp() if date else None, 'received': time.time(), 'edited': edited,
+        })
+
+    async def on_edit(event):
+        await on_message(event, edited=True)
+
+    async def heartbeat():
+        # Only beat while the session is connected, so a dead session times out at the coordinator
+        while True:
+            if client.is_connected():
+                send({'type': 'heartbeat'})
+            await writer.drain()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    client.add_event_handler(on_message, events.NewMessage())
+    client.add_event_handler(on_edit, events.MessageEdited())
+    send({'type': 'hello', 'shard': session, 'token': token})
+    tasks = [asyncio.create_task(heartbeat()), asyncio.create_task(client.run_until_disconnected())]
+    tasks[1].add_done_callback(lambda _: writer.close())  # session gave up: drop out so we get restarted
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break  # coordinator went away
+            message = json.loads(line)
+            if message['type'] == 'assign':
+                assigned = ChannelRegistry(message['channels'], cache_file=registry.cache_file)
+                await assigned.resolve(client)
+                registry = assigned
+                send({
+                    'type': 'resolved',
+                    'channels': [
+                        {'spec': channel.spec, 'peer_id': channel.peer_id, 'username': channel.username, 'title': channel.title}
+                        for channel in registry.resolved()
+                    ],
+                    'errors': registry.errors,
+                })
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+        await client.disconnect()
+
+
+async def login(session):
+    client = TelegramClient(session, os.getenv('API_ID'), os.getenv('API_HASH'))
+    await client.start()
+    me = await client.get_me()
+    print(f"Session {session} logged in as {me.first_name} (@{me.username})")
+    await client.disconnect()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Shard worker for monitor_account.py")
+    parser.add_argument('--session', help='Telethon session name')
+    parser.add_argument('--port', type=int, help='coordinator port on 127.0.0.1')
+    parser.add_argument('--login', metavar='SESSION', help='log a session in interactively and exit')
+    args = parser.parse_args()
+    if args.login:
+        asyncio.run(login(args.login))
+    elif args.session and args.port:
+        asyncio.run(run(args.session, args.port, os.getenv('SHARD_TOKEN', '')))
+    else:
+        parser.error('either --login SESSION or --session and --port are required')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from ingest import Post
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shard_worker.py')
+RATE_WINDOW = 60.0
+
+
+def _weight(spec, shard):
+    return int.from_bytes(hashlib.blake2b(f'{spec}|{shard}'.encode(), digest_size=8).digest(), 'big')
+
+
+def assign_channels(specs, shards):
+    """Rendezvous hashing: each spec goes to the live shard with the highest weight.
+
+    When a shard dies only its own channels move, and they move back when it
+    returns; every other channel stays where it is.
+    """
+    assignment = {shard: [] for shard in shards}
+    if not shards:
+        return assignment
+    for spec in specs:
+        assignment[max(shards, key=lambda shard: _weight(spec, shard))].append(spec)
+    return assignment
+
+
+class Shard:
+    """Coordinator-side state for one worker process."""
+
+    def __init__(self, name):
+        self.name = name
+        self.process = None
+        self.writer = None
+        self.channels = []
+        self.last_heartbeat = None
+        self.messages = 0
+        self.restarts = 0
+        self.last_error = None
+        self.stderr = deque(maxlen=5)
+        self.arrivals = deque()  # monotonic receipt times inside RATE_WINDOW
+        self.ipc_lag = deque(maxlen=500)  # worker receipt -> coordinator receipt
+        self.receive_lag = deque(maxlen=500)  # Telegram message.date -> worker receipt
+
+    @property
+    def live(self):
+        return self.writer is not None
+
+    def rate(self):
+        """Messages per minute over the last RATE_WINDOW seconds."""
+        cutoff = time.monotonic() - RATE_WINDOW
+        while self.arrivals and self.arrivals[0] < cutoff:
+            self.arrivals.popleft()
+        return len(self.arrivals) * 60.0 / RATE_WINDOW
+
+    @staticmethod
+    def _p50(samples):
+        return sorted(samples)[len(samples) // 2] if samples else None
+
+    def report(self):
+        return {
+            'shard': self.name,
+            'live': self.live,
+            'channels': len(self.channels),
+            'messages': self.messages,
+            'per_minute': round(self.rate(), 1),
+            'ipc_lag_ms': round(self._p50(self.ipc_lag) * 1000, 1) if self.ipc_lag else None,
+            'receive_lag_s': round(self._p50(self.receive_lag), 2) if self.receive_lag else None,
+            'restarts': self.restarts,
+            'last_error': self.last_error,
+        }
+
+
+class ShardCoordinator:
+    """Split the configured channels across worker processes, one user session each.
+
+    Workers (shard_worker.py) connect back over 127.0.0.1 TCP, authenticate
+    with a per-run token and stream posts as JSON lines; each post is handed
+    to handle(Post) exactly like a post from the coordinator's own session,
+    so dedup and forwarding stay here. A worker that exits or misses
+    heartbeats for `heartbeat_timeout` seconds has its channels reassigned to
+    the live shards and is restarted with exponential backoff.
+    """
+
+    def __init__(self, sessions, registry, handle, status_callback=None, heartbeat_timeout=30.0, max_backoff=300.0):
+        self.shards = {name: Shard(name) for name in sessions}
+        self.registry = registry
+        self.handle = handle
+        self.status_callback = status_callback
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_backoff = max_backoff
+        self.token = secrets.token_hex(16)
+        self.port = None
+        self._server = None
+        self._tasks = []
+        self._posts = set()  # handle() tasks, kept referenced until done
+        self._stopping = False
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._on_connect, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.create_task(self._supervise(shard)) for shard in self.shards.values()]
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for shard in self.shards.values():
+            if shard.process is not None and shard.process.returncode is None:
+                shard.process.terminate()
+                await shard.process.wait()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _supervise(self, shard):
+        delay = 5
+        while True:
+            started = time.monotonic()
+            shard.process = await asyncio.create_subprocess_exec(
+                sys.executable, WORKER_SCRIPT, '--session', shard.name, '--port', str(self.port),
+                env={**os.environ, 'SHARD_TOKEN': self.token},
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            )
+            async for line in shard.process.stderr:
+                shard.stderr.append(line.decode(errors='replace').rstrip())
+            code = await shard.process.wait()
+            shard.last_error = shard.stderr[-1] if shard.stderr else f"exit code {code}"
+            await self._drop(shard, f"worker exited ({shard.last_error})")
+            if time.monotonic() - started > 600:
+                delay = 5  # it ran fine for a while; restart promptly
+            shard.restarts += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    async def _on_connect(self, reader, writer):
+        shard = None
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(), self.heartbeat_timeout))
+            shard = self.shards.get(hello.get('shard'))
+            if shard is None or not secrets.compare_digest(hello.get('token', ''), self.token):
+                shard = None
+                return
+            shard.writer = writer
+            shard.last_heartbeat = time.monotonic()
+            self._report(f"Shard {shard.name} connected", "success")
+            await self.rebalance()
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.heartbeat_timeout)
+                if not line:
+                    break
+                self._on_message(shard, json.loads(line))
+        except asyncio.TimeoutError:
+            if shard is not None and shard.process is not None and shard.process.returncode is None:
+                shard.process.terminate()  # hung session; _supervise restarts it
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+            if shard is not None and shard.writer is writer:
+                await self._drop(shard, "connection lost")
+
+    def _on_message(self, shard, message):
+        kind = message.get('type')
+        if kind == 'heartbeat':
+            shard.last_heartbeat = time.monotonic()
+        elif kind == 'post':
+            now = time.time()
+            shard.last_heartbeat = time.monotonic()
+            shard.messages += 1
+            shard.arrivals.append(time.monotonic())
+            shard.ipc_lag.append(max(0.0, now - message['received']))
+            posted_at = None
+            if message.get('date') is not None:
+                posted_at = datetime.fromtimestamp(message['date'], timezone.utc)
+                shard.receive_lag.append(max(0.0, message['received'] - message['date']))
+            post = Post(
+                f"shard:{shard.name}", message['chat_id'], None, message['message_id'], message['text'],
+                posted_at, received_at=time.monotonic() - (now - message['received']), edited=message.get('edited', False),
+            )
+            task = asyncio.create_task(self.handle(post))
+            self._posts.add(task)
+            task.add_done_callback(self._posts.discard)
+        elif kind == 'resolved':
+            for channel in message['channels']:
+                if self.registry.get(channel['peer_id']) is None:
+                    self.registry.learn(channel['spec'], channel['peer_id'], channel['username'], channel['title'])
+            for spec, error in message.get('errors', {}).items():
+                self._report(f"Shard {shard.name} could not resolve {spec}: {error}", "error")
+
+    async def _drop(self, shard, reason):
+        if not shard.live or self._stopping:
+            return
+        shard.writer = None
+        shard.channels = []
+        self._report(f"Shard {shard.name} down: {reason}; rebalancing", "warning")
+        await self.rebalance()
+
+    async def rebalance(self):
+        """Reassign channels across live shards; only shards whose set changed are told."""
+        live = [name for name, shard in self.shards.items() if shard.live]
+        specs = [channel.spec for channel in self.registry.channels if channel.enabled]
+        for name, channels in assign_channels(specs, live).items():
+            shard = self.shards[name]
+            if channels == shard.channels or shard.writer is None:
+                continue
+            shard.channels = channels
+            shard.writer.write((json.dumps({'type': 'assign', 'channels': channels}) + '\n').encode())
+            try:
+                await shard.writer.drain()
+            except ConnectionError:
+                pass
+        if live:
+            self._report(f"Shards: {', '.join(f'{name}={len(self.shards[name].channels)}' for name in live)} channels", "info")
+
+    def reports(self):
+        return [shard.report() for shard in self.shards.values()]
+
+    def summary(self):
+        live = [shard for shard in self.shards.values() if shard.live]
+        lags = [shard.report()['ipc_lag_ms'] for shard in live if shard.ipc_lag]
+        lag = f", worst ipc lag p50 {max(lags):.1f}ms" if lags else ""
+        return f"{len(live)}/{len(self.shards)} up, {sum(shard.rate() for shard in live):.0f} msg/min{lag}"
+
+    def prometheus_lines(self):
+        lines = []
+        for name, kind, value in (
+            ('buybot_shard_up', 'gauge', lambda report: int(report['live'])),
+            ('buybot_shard_channels', 'gauge', lambda report: report['channels']),
+            ('buybot_shard_messages_total', 'counter', lambda report: report['messages']),
+            ('buybot_shard_restarts_total', 'counter', lambda report: report['restarts']),
+            ('buybot_shard_ipc_lag_ms', 'gauge', lambda report: report['ipc_lag_ms'] if report['ipc_lag_ms'] is not None else 'NaN'),
+            ('buybot_shard_receive_lag_seconds', 'gauge', lambda report: report['receive_lag_s'] if report['receive_lag_s'] is not None else 'NaN'),
+        ):
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{{shard="{report["shard"]}"}} {value(report)}' for report in self.reports())
+        return lines
+
+    def _report(self, message, status_type):
+        if self.status_callback:
+            self.status_callback(message, status_type)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+from telethon.tl import types
+from telethon.tl.functions import PingRequest
+
+PROBE_MESSAGES = 5  # recent messages fetched per probe, to see past service messages
+
+
+class ConnectionSupervisor:
+    """Watchdog around the Telethon client.
+
+    - Pings Telegram every `ping_interval` seconds and records the RTT.
+      Two failed pings in a row force a reconnect.
+    - Learns each channel's normal gap between posts (EWMA). When a channel
+      has been silent for `silence_factor` times its usual gap (and at least
+      `min_silence` seconds), its newest messages are fetched. A message we
+      never received means updates have stalled, and a reconnect is forced.
+      Service messages (pins, title or photo changes) are ignored, since
+      NewMessage never delivers them and last_seen doesn't move for them.
+    - Forced reconnects just disconnect the client. telegram_client_task
+      then reconnects and catches up. Reconnects back off exponentially.
+    - run_client() restarts the client task whenever it crashes.
+    """
+
+    def __init__(self, client, registry, last_seen, status_callback=None, ping_interval=30.0,
+                 ping_timeout=10.0, silence_factor=5.0, min_silence=120.0, max_backoff=300.0):
+        self.client = client
+        self.registry = registry
+        self.last_seen = last_seen
+        self.status_callback = status_callback
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.silence_factor = silence_factor
+        self.min_silence = min_silence
+        self.max_backoff = max_backoff
+        self.rtt = None
+        self.ping_failures = 0
+        self.reconnects = 0
+        self.restarts = 0
+        self.last_reconnect_reason = None
+        self.last_update = time.monotonic()
+        self._last_post = {}
+        self._gap = {}
+        self._probed = {}
+        self._backoff = 0.0
+        self._next_reconnect = 0.0
+        self._started = time.monotonic()
+
+    def observe(self, peer_id):
+        """Record a live update from peer_id (called from the message handler)."""
+        now = time.monotonic()
+        self.last_update = now
+        previous = self._last_post.get(peer_id)
+        if previous is not None:
+            gap = now - previous
+            self._gap[peer_id] = gap if peer_id not in self._gap else 0.8 * self._gap[peer_id] + 0.2 * gap
+        self._last_post[peer_id] = now
+
+    async def run_client(self, task_factory):
+        """Run task_factory() forever, restarting it with backoff if it raises."""
+        delay = 1
+        while True:
+            try:
+                await task_factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.restarts += 1
+                self._report(f"Client task crashed ({e}); restarting in {delay}s", "error")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+                try:
+                    if not self.client.is_connected():
+                        await self.client.connect()
+                except Exception as connect_error:
+                    self._report(f"Reconnect failed: {connect_error}", "error")
+
+    async def watchdog(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if not self.client.is_connected():
+                continue
+            await self._ping()
+            await self._check_silence()
+
+    async def _ping(self):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.client(PingRequest(ping_id=random.getrandbits(63))), self.ping_timeout)
+        except Exception as e:
+            self.ping_failures += 1
+            self._report(f"Keepalive ping failed ({self.ping_failures}x): {e or type(e).__name__}", "warning")
+            if self.ping_failures >= 2:
+                await self.force_reconnect("keepalive pings failing")
+            return
+        self.ping_failures = 0
+        self.rtt = time.monotonic() - started
+
+    async def _check_silence(self):
+        now = time.monotonic()
+        for channel in self.registry.resolved():
+            peer_id = channel.peer_id
+            gap = self._gap.get(peer_id)
+            last = self._last_post.get(peer_id)
+            if not channel.enabled or gap is None or last is None:
+                continue
+            threshold = max(self.min_silence, self.silence_factor * gap)
+            if now - last < threshold or now - self._probed.get(peer_id, 0) < threshold:
+                continue
+            self._probed[peer_id] = now
+            try:
+                recent = await self.client.get_messages(peer_id, limit=PROBE_MESSAGES)
+            except Exception as e:
+                self._report(f"Could not probe {channel.name}: {e}", "warning")
+                continue
+            latest = next((message for message in recent if not isinstance(message, types.MessageService)), None)
+            if latest is not None and latest.id > (self.last_seen.get(peer_id) or 0):
+                await self.force_reconnect(f"missed updates from {channel.name}")
+                return
+
+    async def force_reconnect(self, reason):
+        now = time.monotonic()
+        if now < self._next_reconnect:
+            return
+        if now - self._next_reconnect > 600:
+            self._backoff = 0.0  # stable for a while; start over
+        self._backoff = min(self.max_backoff, max(5.0, self._backoff * 2))
+        self._next_reconnect = now + self._backoff
+        self.reconnects += 1
+        self.ping_failures = 0
+        self.last_reconnect_reason = reason
+        self._report(f"Forcing reconnect: {reason}", "warning")
+        await self.client.disconnect()
+
+    def health(self):
+        connected = self.client.is_connected()
+        silence = time.monotonic() - self.last_update
+        if not connected:
+            status = 'down'
+        elif self.ping_failures:
+            status = 'degraded'
+        else:
+            status = 'ok'
+        return {
+            'status': status,
+            'connected': connected,
+            'rtt_ms': round(self.rtt * 1000, 1) if self.rtt is not None else None,
+            'seconds_since_update': round(silence, 1),
+            'ping_failures': self.ping_failures,
+            'reconnects': self.reconnects,
+            'restarts': self.restarts,
+            'last_reconnect_reason': self.last_reconnect_reason,
+            'uptime_seconds': round(time.monotonic() - self._started, 1),
+        }
+
+    def health_response(self):
+        """(status_code, content_type, body) for the /health endpoint."""
+        health = self.health()
+        return (200 if health['status'] != 'down' else 503), 'application/json', json.dumps(health)
+
+    def prometheus_lines(self):
+        health = self.health()
+        return [
+            '# TYPE buybot_connected gauge',
+            f"buybot_connected {int(health['connected'])}",
+            '# TYPE buybot_ping_rtt_seconds gauge',
+            f"buybot_ping_rtt_seconds {self.rtt if self.rtt is not None else 'NaN'}",
+            '# TYPE buybot_reconnects_total counter',
+            f"buybot_reconnects_total {self.reconnects}",
+            '# TYPE buybot_client_restarts_total counter',
+            f"buybot_client_restarts_total {self.restarts}",
+        ]
+
+    def _report(self, message, status_type):
+        if self.status_callback:
+            self.status_callback(message, status_type)
+
+
+def supervisor_from_env(client, registry, last_seen, status_callback=None):
+    """Build a ConnectionSupervisor from WATCHDOG_INTERVAL, SILENCE_FACTOR and MIN_SILENCE."""
+    return ConnectionSupervisor(
+        client, registry, last_seen, status_callback=status_callback,
+        ping_interval=float(os.getenv('WATCHDOG_INTERVAL', '30')),
+        silence_factor=float(os.getenv('SILENCE_FACTOR', '5')),
+        min_silence=float(os.getenv('MIN_SILENCE', '120')),
+    )